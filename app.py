@@ -1,9 +1,9 @@
 import json
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from pymongo import MongoClient
-from managers import EncryptionKeyManager
-from helpers import CollectionGetter, CollectionPoster, CollectionDeleter, CollectionUpdater
-from validation import DataValidator
+from managers import EncryptionKeyManager, EncryptionPolicy
+from helpers import HandlerRegistry
+import parsing
 
 
 app = Flask(__name__)
@@ -17,330 +17,243 @@ try:
         database = config['database']
         n_applications = config['n_applications']
         credit_transaction_size = config['credit_transaction_size']
+        write_concern = config.get('write_concern')
+        page_size = config.get('page_size', 100)
+        max_page_size = config.get('max_page_size', 1000)
+        cache_size = config.get('cache_size')
+        cache_ttl = config.get('cache_ttl')
 except Exception as e:
     raise e
 
 client = MongoClient(f"mongodb://{hostname}:{port}/")
 db = client[database]
-em = EncryptionKeyManager('encryption_key.key')
+em = EncryptionKeyManager('encryption_key.key', policy=EncryptionPolicy.from_config(config))
+registry = HandlerRegistry(client=client, database=database,
+                           collections=['applications', 'user_profiles', 'contact_info', 'banking_info',
+                                        'credit_accounts', 'credit_transactions', 'financial_info'],
+                           schema_directory='schema', encryption_manager=em, is_encrypted=True,
+                           write_concern=write_concern, page_size=page_size, max_page_size=max_page_size,
+                           cache_size=cache_size, cache_ttl=cache_ttl)
+
+
+def create_item(collection: str):
+    try:
+        data = request.json
+        error = parsing.invalid_item(data)
+        if error:
+            return error
+        return registry.get(collection, 'create').handle_item(item=data)
+    except Exception as e:
+        return parsing.failure("Failed to post item", e)
+
+
+def update_item(collection: str, item_id: str):
+    try:
+        data = request.json
+        error = parsing.invalid_item(data)
+        if error:
+            return error
+        return registry.get(collection, 'update').handle_item(item_id=item_id, data=data)
+    except Exception as e:
+        return parsing.failure("Failed to update item", e)
 
 
 # ===========================APPLICATION CRUD==============================
 @app.route("/retrieve/application/<string:item_id>/", methods=["GET"])
 def get_application(item_id: str):
-    application_getter = CollectionGetter(client=client, database=database, collection='applications',
-                                          encryption_manager=em, is_encrypted=True)
-    item = application_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('applications', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/create/application/', methods=['POST'])
 def create_application():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='applications', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('applications')
 
 
 @app.route('/update/application/<string:item_id>/', methods=['PATCH'])
 def update_application(item_id:str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='applications', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('applications', item_id)
 
 
 @app.route('/delete/application/<string:item_id>/', methods=['DELETE'])
 def delete_application(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='applications')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('applications', 'delete').handle_item(item_id=item_id)
 
 
 # ===========================USER PROFILE CRUD==============================
 @app.route('/create/user_profile/', methods =['POST'])
 def create_user_profile():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='user_profiles', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('user_profiles')
 
 
 @app.route("/update/user_profile/<string:item_id>/", methods=['PATCH'])
 def update_user_profile(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='user_profiles', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('user_profiles', item_id)
 
 
 @app.route("/retrieve/user_profile/<string:item_id>/", methods=["GET"])
 def get_user_profile(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='user_profiles',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('user_profiles', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/user_profile/<string:item_id>/', methods=['DELETE'])
 def delete_user_profile(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='user_profiles')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('user_profiles', 'delete').handle_item(item_id=item_id)
 
 
 # ===========================CONTACT INFO CRUD==============================
 @app.route('/create/contact_info/', methods =['POST'])
 def create_contact_info():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='contact_info', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('contact_info')
 
 
 @app.route("/update/contact_info/<string:item_id>/", methods=['PATCH'])
 def update_contact_info(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='contact_info', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('contact_info', item_id)
 
 
 @app.route("/retrieve/contact_info/<string:item_id>/", methods=["GET"])
 def get_contact_info(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='contact_info',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('contact_info', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/contact_info/<string:item_id>/', methods=['DELETE'])
 def delete_contact_info(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='contact_info')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('contact_info', 'delete').handle_item(item_id=item_id)
 
 
 # ===========================CONTACT INFO CRUD==============================
 @app.route('/create/banking_info/', methods =['POST'])
 def create_banking_info():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='banking_info', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('banking_info')
 
 
 @app.route("/update/banking_info/<string:item_id>/", methods=['PATCH'])
 def update_banking_info(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='banking_info', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('banking_info', item_id)
 
 
 @app.route("/retrieve/banking_info/<string:item_id>/", methods=["GET"])
 def get_banking_info(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='banking_info',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('banking_info', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/banking_info/<string:item_id>/', methods=['DELETE'])
 def delete_banking_info(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='banking_info')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('banking_info', 'delete').handle_item(item_id=item_id)
 
 
 # ===========================CREDIT ACCOUNTS CRUD==============================
 @app.route('/create/credit_account/', methods =['POST'])
 def create_credit_account():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='credit_accounts', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('credit_accounts')
 
 
 @app.route("/update/credit_account/<string:item_id>/", methods=['PATCH'])
 def update_credit_account(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='credit_accounts', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('credit_accounts', item_id)
 
 
 @app.route("/retrieve/credit_account/<string:item_id>/", methods=["GET"])
 def get_credit_account(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='credit_accounts',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('credit_accounts', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/credit_account/<string:item_id>/', methods=['DELETE'])
 def delete_credit_account(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='credit_accounts')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('credit_accounts', 'delete').handle_item(item_id=item_id)
 
 
 # ===========================CREDIT TRANSACTIONS CRUD==============================
 @app.route('/create/credit_transaction/', methods =['POST'])
 def create_credit_transaction():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='credit_transactions', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('credit_transactions')
 
 
 @app.route("/update/credit_transaction/<string:item_id>/", methods=['PATCH'])
 def update_credit_transaction(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='credit_transactions', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('credit_transactions', item_id)
 
 
 @app.route("/retrieve/credit_transaction/<string:item_id>/", methods=["GET"])
 def get_credit_transaction(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='credit_transactions',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('credit_transactions', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/credit_transaction/<string:item_id>/', methods=['DELETE'])
 def delete_credit_transaction(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='credit_transactions')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('credit_transactions', 'delete').handle_item(item_id=item_id)
 
 # ===========================FINANCIAL INFO CRUD==============================
 @app.route('/create/financial_info/', methods =['POST'])
 def create_financial_info():
-    validator = DataValidator('schema')
-    cp = CollectionPoster(client=client, database=database, collection='financial_info', data_validator=validator,
-                          encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cp.handle_item(item=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to post item", "details": str(e)}), 500
+    return create_item('financial_info')
 
 
 @app.route("/update/financial_info/<string:item_id>/", methods=['PATCH'])
 def update_financial_info(item_id: str):
-    validator = DataValidator('schema', update=True)
-    cu = CollectionUpdater(client=client, database=database, collection='financial_info', data_validator=validator,
-                           encryption_manager=em, is_encrypted=True)
-    try:
-        data = request.json
-        if not data:
-            return jsonify({"error": "Invalid input"}), 400
-        result = cu.handle_item(item_id=item_id, data=data)
-        return result
-    except Exception as e:
-        return jsonify({"error": "Failed to update item", "details": str(e)}), 500
+    return update_item('financial_info', item_id)
 
 
 @app.route("/retrieve/financial_info/<string:item_id>/", methods=["GET"])
 def get_financial_info(item_id: str):
-    profile_getter = CollectionGetter(client=client, database=database, collection='financial_info',
-                                      encryption_manager=em, is_encrypted=True)
-    item = profile_getter.handle_item(item_id=item_id)
-    return item
+    return registry.get('financial_info', 'retrieve').handle_item(item_id=item_id)
 
 
 @app.route('/delete/financial_info/<string:item_id>/', methods=['DELETE'])
 def delete_financial_info(item_id: str):
-    cd = CollectionDeleter(client=client, database=database, collection='financial_info')
-    result = cd.handle_item(item_id=item_id)
-    return result
+    return registry.get('financial_info', 'delete').handle_item(item_id=item_id)
+
+
+# ===========================BULK CRUD==============================
+@app.route('/bulk/<string:collection>/', methods=['POST', 'GET', 'PATCH', 'DELETE'])
+def bulk_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    try:
+        if request.method in ('GET', 'DELETE'):
+            ids = parsing.bulk_ids(request.args, request.json if request.is_json else None)
+            error = parsing.invalid_item(ids)
+            if error:
+                return error
+            operation = 'bulk_retrieve' if request.method == 'GET' else 'bulk_delete'
+            return registry.get(collection, operation).handle_item(item_ids=ids)
+
+        data = request.json
+        operation = 'bulk_create' if request.method == 'POST' else 'bulk_update'
+        error = parsing.invalid_items(data)
+        if error:
+            return error
+        return registry.get(collection, operation).handle_item(items=data)
+    except Exception as e:
+        return parsing.failure("Bulk operation failed", e)
+
+
+# ===========================LIST & EXPORT==============================
+@app.route('/list/<string:collection>/', methods=['GET'])
+def list_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    try:
+        limit = request.args.get('limit', type=int)
+        return registry.get(collection, 'list').handle_item(after=request.args.get('after'), limit=limit,
+                                                            fields=parsing.fields(request.args),
+                                                            where=parsing.where(request.args))
+    except Exception as e:
+        return parsing.failure("Failed to list items", e)
+
+
+@app.route('/export/<string:collection>/', methods=['GET'])
+def export_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    chunks = registry.get(collection, 'export').handle_item(fields=parsing.fields(request.args))
+    return Response(stream_with_context(chunks), mimetype='application/x-ndjson')
+
+
+# ===========================METRICS==============================
+@app.route('/metrics/cache/', methods=['GET'])
+def cache_metrics():
+    return jsonify({collection: cache.stats() for collection, cache in registry.caches.items()})
@@ -0,0 +1,148 @@
+import json
+from quart import Quart, jsonify, request
+from pymongo import AsyncMongoClient
+from managers import EncryptionKeyManager, EncryptionPolicy
+from async_helpers import AsyncHandlerRegistry
+import parsing
+
+# Async counterpart of app.py with the same routes, served by an ASGI server:
+#
+#     hypercorn asgi:app --bind 127.0.0.1:8000
+
+app = Quart(__name__)
+
+try:
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+
+        hostname = config['hostname']
+        port = config['port']
+        database = config['database']
+        write_concern = config.get('write_concern')
+        page_size = config.get('page_size', 100)
+        max_page_size = config.get('max_page_size', 1000)
+        cache_size = config.get('cache_size')
+        cache_ttl = config.get('cache_ttl')
+        crypto_workers = config.get('crypto_workers')
+except Exception as e:
+    raise e
+
+client = AsyncMongoClient(f"mongodb://{hostname}:{port}/")
+em = EncryptionKeyManager('encryption_key.key', policy=EncryptionPolicy.from_config(config))
+registry = AsyncHandlerRegistry(client=client, database=database,
+                                collections=['applications', 'user_profiles', 'contact_info', 'banking_info',
+                                             'credit_accounts', 'credit_transactions', 'financial_info'],
+                                schema_directory='schema', encryption_manager=em, is_encrypted=True,
+                                write_concern=write_concern, page_size=page_size, max_page_size=max_page_size,
+                                cache_size=cache_size, cache_ttl=cache_ttl, crypto_workers=crypto_workers)
+
+# Route name used in the single-item URLs -> MongoDB collection, as in app.py.
+ROUTES = {
+    'application': 'applications',
+    'user_profile': 'user_profiles',
+    'contact_info': 'contact_info',
+    'banking_info': 'banking_info',
+    'credit_account': 'credit_accounts',
+    'credit_transaction': 'credit_transactions',
+    'financial_info': 'financial_info',
+}
+
+
+async def create_item(collection: str):
+    try:
+        data = await request.get_json()
+        error = parsing.invalid_item(data)
+        if error:
+            return error
+        return await registry.get(collection, 'create').handle_item(item=data)
+    except Exception as e:
+        return parsing.failure("Failed to post item", e)
+
+
+async def update_item(collection: str, item_id: str):
+    try:
+        data = await request.get_json()
+        error = parsing.invalid_item(data)
+        if error:
+            return error
+        return await registry.get(collection, 'update').handle_item(item_id=item_id, data=data)
+    except Exception as e:
+        return parsing.failure("Failed to update item", e)
+
+
+def _register_crud(route: str, collection: str):
+    async def retrieve(item_id: str):
+        return await registry.get(collection, 'retrieve').handle_item(item_id=item_id)
+
+    async def create():
+        return await create_item(collection)
+
+    async def update(item_id: str):
+        return await update_item(collection, item_id)
+
+    async def delete(item_id: str):
+        return await registry.get(collection, 'delete').handle_item(item_id=item_id)
+
+    app.add_url_rule(f"/retrieve/{route}/<string:item_id>/", f"get_{route}", retrieve, methods=["GET"])
+    app.add_url_rule(f"/create/{route}/", f"create_{route}", create, methods=["POST"])
+    app.add_url_rule(f"/update/{route}/<string:item_id>/", f"update_{route}", update, methods=["PATCH"])
+    app.add_url_rule(f"/delete/{route}/<string:item_id>/", f"delete_{route}", delete, methods=["DELETE"])
+
+
+for route_name, collection_name in ROUTES.items():
+    _register_crud(route_name, collection_name)
+
+
+# ===========================BULK CRUD==============================
+@app.route('/bulk/<string:collection>/', methods=['POST', 'GET', 'PATCH', 'DELETE'])
+async def bulk_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    try:
+        if request.method in ('GET', 'DELETE'):
+            ids = parsing.bulk_ids(request.args, await request.get_json() if request.is_json else None)
+            error = parsing.invalid_item(ids)
+            if error:
+                return error
+            operation = 'bulk_retrieve' if request.method == 'GET' else 'bulk_delete'
+            return await registry.get(collection, operation).handle_item(item_ids=ids)
+
+        data = await request.get_json()
+        operation = 'bulk_create' if request.method == 'POST' else 'bulk_update'
+        error = parsing.invalid_items(data)
+        if error:
+            return error
+        return await registry.get(collection, operation).handle_item(items=data)
+    except Exception as e:
+        return parsing.failure("Bulk operation failed", e)
+
+
+# ===========================LIST & EXPORT==============================
+@app.route('/list/<string:collection>/', methods=['GET'])
+async def list_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    try:
+        limit = request.args.get('limit', type=int)
+        return await registry.get(collection, 'list').handle_item(after=request.args.get('after'), limit=limit,
+                                                                  fields=parsing.fields(request.args),
+                                                                  where=parsing.where(request.args))
+    except Exception as e:
+        return parsing.failure("Failed to list items", e)
+
+
+@app.route('/export/<string:collection>/', methods=['GET'])
+async def export_items(collection: str):
+    error = parsing.unknown_collection(collection, registry.handlers)
+    if error:
+        return error
+    chunks = registry.get(collection, 'export').handle_item(fields=parsing.fields(request.args))
+    return chunks, 200, {"Content-Type": "application/x-ndjson"}
+
+
+# ===========================METRICS==============================
+@app.route('/metrics/cache/', methods=['GET'])
+async def cache_metrics():
+    return jsonify({collection: cache.stats() for collection, cache in registry.caches.items()})
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pymongo import ReturnDocument, UpdateOne
+from helpers import (HandlerRegistry, CollectionGetter, CollectionPoster, CollectionUpdater, CollectionDeleter,
+                     BulkGetter, BulkPoster, BulkUpdater, BulkDeleter, CollectionLister, CollectionExporter)
+
+
+class AsyncHandlerMixin:
+    """
+    Turns a handler from `helpers.py` into one that awaits an async MongoDB collection.
+
+    Validation, encryption and query building are inherited from the synchronous handler.
+    Fernet work is moved off the event loop onto a thread pool.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The thread pool encryption and decryption run on.
+    """
+
+    executor = None
+
+    def __init__(self, *args, executor=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = executor
+
+    async def _offload(self, func, *args, **kwargs):
+        """Run a blocking function (Fernet, schema validation) on the executor."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def _decrypt(self, item: dict):
+        if item is None or not self.is_encrypted or not self.encryption_manager:
+            return item
+        return await self._offload(self.encryption_manager.decrypt_document, item, collection=self.collection_name)
+
+    async def _decrypt_all(self, items: list) -> list:
+        if not self.is_encrypted or not self.encryption_manager:
+            return items
+        return await self._offload(self.encryption_manager.decrypt_many, items, collection=self.collection_name)
+
+
+class AsyncCollectionGetter(AsyncHandlerMixin, CollectionGetter):
+    async def handle_item(self, item_id: str):
+        item = self.cache.get(item_id) if self.cache is not None else None
+        if item is None:
+            generation = self.cache.generation() if self.cache is not None else None
+            item = await self._decrypt(await self.collection.find_one({"_id": item_id}))
+            if self.cache is not None:
+                self.cache.put(item, generation=generation)
+        if item is None:
+            return {"error": f"{item_id} not found"}, 404
+        return item, 200
+
+
+class AsyncCollectionPoster(AsyncHandlerMixin, CollectionPoster):
+    async def handle_item(self, item: dict):
+        validated_data = await self._offload(self._validate, item)
+        item_id = str(uuid.uuid4())
+        document = await self._offload(self._encrypt_item, validated_data)
+        document['_id'] = item_id
+        result = await self.collection.insert_one(document)
+        return {"success": result.acknowledged, "item": {**validated_data, "_id": item_id}}, 201
+
+
+class AsyncCollectionUpdater(AsyncHandlerMixin, CollectionUpdater):
+    async def handle_item(self, item_id: str, data: dict):
+        validated_data = await self._offload(self._validate, data)
+        if self._is_packed():
+            item = await self._replace_item(item_id, validated_data)
+        else:
+            update = await self._offload(self._encrypt_item, validated_data)
+            item = await self.collection.find_one_and_update({"_id": item_id}, {"$set": update},
+                                                             return_document=ReturnDocument.AFTER)
+            item = await self._decrypt(item)
+        if self.cache is not None:
+            self.cache.invalidate(item_id)
+        return {"success": item is not None, "item": item}, 200
+
+    async def _replace_item(self, item_id: str, data: dict):
+        for _ in range(self.max_retries):
+            current = await self.collection.find_one({"_id": item_id})
+            if current is None:
+                return None
+            item, document = await self._offload(self._merge, current, data)
+            if await self.collection.find_one_and_replace(current, document) is not None:
+                return item
+        raise RuntimeError(f"{item_id} was modified concurrently {self.max_retries} times")
+
+
+class AsyncCollectionDeleter(AsyncHandlerMixin, CollectionDeleter):
+    async def handle_item(self, item_id: str):
+        try:
+            await self.collection.delete_one({"_id": item_id})
+            if self.cache is not None:
+                self.cache.invalidate(item_id)
+            return {"success": f"Deleted {item_id} from {self.collection.name}"}, 204
+        except Exception as e:
+            return {"error": "Deletion failed", "details": str(e)}, 500
+
+
+class AsyncBulkGetter(AsyncHandlerMixin, BulkGetter):
+    async def handle_item(self, item_ids: list):
+        cached, missing, generation = self._cached(item_ids)
+        items = await self.collection.find({"_id": {"$in": missing}}).to_list(None) if missing else []
+        return {"items": cached + self._remember(await self._decrypt_all(items), generation)}, 200
+
+
+class AsyncBulkPoster(AsyncHandlerMixin, BulkPoster):
+    async def handle_item(self, items: list):
+        errors = await self._offload(self._validation_errors, items)
+        if errors:
+            return {"error": "Validation failed", "details": errors}, 400
+
+        items = [{**item, "_id": str(uuid.uuid4())} for item in items]
+        result = await self.collection.insert_many(await self._offload(self._encrypt_items, items), ordered=False)
+        return {"success": result.acknowledged, "items": items}, 201
+
+
+class AsyncBulkUpdater(AsyncHandlerMixin, BulkUpdater):
+    async def handle_item(self, items: list):
+        if any("_id" not in item for item in items):
+            return {"error": "Every item must have an _id"}, 400
+        updates = [{key: value for key, value in item.items() if key != "_id"} for item in items]
+        errors = await self._offload(self._validation_errors, updates)
+        if errors:
+            for error in errors:
+                error["_id"] = items[error["index"]]["_id"]
+            return {"error": "Validation failed", "details": errors}, 400
+
+        if self._is_packed():
+            currents = await self.collection.find({"_id": {"$in": [item["_id"] for item in items]}}).to_list(None)
+            requests = await self._offload(self._replacements, currents, items)
+        else:
+            encrypted_updates = await self._offload(self._encrypt_items, updates)
+            requests = [UpdateOne({"_id": item["_id"]}, {"$set": update})
+                        for item, update in zip(items, encrypted_updates)]
+        if not requests:
+            return {"success": True, "matched": 0, "modified": 0}, 200
+        result = await self.collection.bulk_write(requests, ordered=False)
+        self._forget([item["_id"] for item in items])
+        return {"success": result.acknowledged, "matched": result.matched_count,
+                "modified": result.modified_count}, 200
+
+
+class AsyncBulkDeleter(AsyncHandlerMixin, BulkDeleter):
+    async def handle_item(self, item_ids: list):
+        try:
+            result = await self.collection.delete_many({"_id": {"$in": item_ids}})
+            self._forget(item_ids)
+            return {"success": result.acknowledged, "deleted": result.deleted_count}, 200
+        except Exception as e:
+            return {"error": "Deletion failed", "details": str(e)}, 500
+
+
+class AsyncCollectionLister(AsyncHandlerMixin, CollectionLister):
+    async def handle_item(self, after=None, limit=None, fields=None, where=None):
+        if limit is not None and limit < 1:
+            return {"error": "Invalid limit", "details": f"limit must be at least 1, got {limit}"}, 400
+        try:
+            query, projection, limit = self._page_query(after=after, limit=limit, fields=fields, where=where)
+        except ValueError as e:
+            return {"error": "Invalid filter", "details": str(e)}, 400
+        items = await self.collection.find(query, projection).sort("_id", 1).limit(limit).to_list(None)
+        return self._page(self._select(await self._decrypt_all(items), fields), limit), 200
+
+
+class AsyncCollectionExporter(AsyncHandlerMixin, CollectionExporter):
+    async def handle_item(self, fields=None):
+        cursor = self.collection.find({}, self._projection(fields), batch_size=self.batch_size)
+        try:
+            batch = []
+            async for item in cursor:
+                batch.append(item)
+                if len(batch) == self.batch_size:
+                    yield await self._serialize(batch, fields)
+                    batch = []
+            if batch:
+                yield await self._serialize(batch, fields)
+        finally:
+            await cursor.close()
+
+    async def _serialize(self, batch: list, fields=None) -> bytes:
+        items = self._select(await self._decrypt_all(batch), fields)
+        return "".join(json.dumps(item, default=str) + "\n" for item in items).encode('utf-8')
+
+
+class AsyncHandlerRegistry(HandlerRegistry):
+    """
+    HandlerRegistry whose handlers await an async MongoDB client and share one thread pool for Fernet work.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The thread pool shared by every handler.
+    """
+
+    handler_classes = {
+        "retrieve": AsyncCollectionGetter,
+        "create": AsyncCollectionPoster,
+        "update": AsyncCollectionUpdater,
+        "delete": AsyncCollectionDeleter,
+        "bulk_retrieve": AsyncBulkGetter,
+        "bulk_create": AsyncBulkPoster,
+        "bulk_update": AsyncBulkUpdater,
+        "bulk_delete": AsyncBulkDeleter,
+        "list": AsyncCollectionLister,
+        "export": AsyncCollectionExporter,
+    }
+
+    def __init__(self, *args, crypto_workers=None, **kwargs):
+        """
+        Args:
+            crypto_workers (int, optional): Threads in the shared encryption pool. Defaults to
+                ThreadPoolExecutor's default.
+
+        Every other argument is passed to HandlerRegistry.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=crypto_workers, thread_name_prefix="crypto")
+        super().__init__(*args, **kwargs)
+
+    def _handler_options(self, operation: str) -> dict:
+        return {**super()._handler_options(operation), "executor": self.executor}
@@ -0,0 +1,34 @@
+import os
+import sys
+import time
+
+# Benchmarks run from the project root so config.json, schema/ and the key file resolve.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+os.chdir(PROJECT_DIR)
+
+
+def percentile(values: list, q: float) -> float:
+    """Return the `q`-th percentile (0-100) of `values` using the nearest-rank method."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def timed(func, *args, **kwargs):
+    """Call `func` and return its result together with the elapsed time in milliseconds."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def print_latencies(title: str, latencies: dict):
+    """Print p50/p99/mean for each named list of millisecond latencies."""
+    print(title)
+    print(f"  {'route':<28}{'n':>7}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name, values in latencies.items():
+        mean = sum(values) / len(values) if values else 0.0
+        print(f"  {name:<28}{len(values):>7}{percentile(values, 50):>10.3f}"
+              f"{percentile(values, 99):>10.3f}{mean:>10.3f}")
@@ -0,0 +1,77 @@
+"""
+Load-test comparison of the sync Flask app (app.py) and the async ASGI app (asgi.py).
+
+Start both servers against the same MongoDB server first, e.g.
+
+    flask --app app run --port 5000 --with-threads
+    hypercorn asgi:app --bind 127.0.0.1:8000
+
+then drive the same read-heavy mix (retrieve and create applications) at each with many
+concurrent connections:
+
+    python benchmarks/load_compare.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:8000 \\
+        --concurrency 200 --requests 5000
+"""
+import argparse
+import asyncio
+import random
+import time
+import aiohttp
+from common import print_latencies
+import functions
+
+
+async def _seed_ids(session: aiohttp.ClientSession, base_url: str, n: int) -> list:
+    users = functions.generate_uuids(n)
+    payloads = functions.generate_application(uuids={"applications": users, "users": users})
+    for payload in payloads:
+        payload.pop("_id")
+    async with session.post(f"{base_url}/bulk/applications/", json=payloads) as response:
+        return [item["_id"] for item in (await response.json())["items"]]
+
+
+async def run(base_url: str, n_requests: int, concurrency: int, write_ratio: float, seed_size: int) -> tuple:
+    latencies = {"retrieve": [], "create": []}
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        ids = await _seed_ids(session, base_url, seed_size)
+        payloads = functions.generate_application(uuids={"applications": ids, "users": ids})
+        remaining = iter(range(n_requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                if random.random() < write_ratio:
+                    route, method, url = "create", session.post, f"{base_url}/create/application/"
+                    payload = {key: value for key, value in random.choice(payloads).items() if key != "_id"}
+                else:
+                    route, method, url = "retrieve", session.get, f"{base_url}/retrieve/application/{random.choice(ids)}/"
+                    payload = None
+                start = time.perf_counter()
+                async with method(url, json=payload) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+                latencies[route].append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, n_requests / elapsed, errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sync', dest='sync_url', default='http://127.0.0.1:5000')
+    parser.add_argument('--async', dest='async_url', default='http://127.0.0.1:8000')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--write-ratio', type=float, default=0.2, help="share of requests that are creates")
+    parser.add_argument('--seed-size', type=int, default=500, help="applications created up front to read")
+    args = parser.parse_args()
+
+    for label, url in (("sync (Flask)", args.sync_url), ("async (ASGI)", args.async_url)):
+        latencies, throughput, errors = asyncio.run(
+            run(url, args.requests, args.concurrency, args.write_ratio, args.seed_size))
+        print_latencies(f"{label} {url}: {throughput:,.0f} req/s, {errors} errors", latencies)
@@ -0,0 +1,68 @@
+"""
+Request latency of the Flask app with per-request handler setup ("before") versus the
+shared HandlerRegistry ("after").
+
+The "before" mode rebuilds the handlers and a cold DataValidator for every request, as
+app.py did before the registry existed. Both modes run through Flask's test client
+against the MongoDB server in config.json:
+
+    python benchmarks/request_latency.py --requests 500
+"""
+import argparse
+from common import print_latencies, timed
+from validation import DataValidator
+import functions
+import helpers
+import app as flask_app
+
+COLLECTION = 'applications'
+ROUTE = 'application'
+
+
+def _per_request_get(collection: str, operation: str):
+    DataValidator._compiled.clear()
+    validator = DataValidator('schema', update=operation == 'update')
+    options = dict(client=flask_app.client, database=flask_app.database, collection=collection,
+                   encryption_manager=flask_app.em, is_encrypted=True)
+    if operation == 'retrieve':
+        return helpers.CollectionGetter(**options)
+    if operation == 'create':
+        return helpers.CollectionPoster(data_validator=validator, **options)
+    if operation == 'update':
+        return helpers.CollectionUpdater(data_validator=validator, **options)
+    return helpers.CollectionDeleter(**options)
+
+
+def run(client, n_requests: int) -> dict:
+    latencies = {"create": [], "retrieve": [], "update": [], "delete": []}
+    users = functions.generate_uuids(n_requests)
+    payloads = functions.generate_application(uuids={"applications": users, "users": users})
+    for payload in payloads:
+        payload.pop("_id")
+        response, elapsed = timed(client.post, f"/create/{ROUTE}/", json=payload)
+        latencies["create"].append(elapsed)
+        item_id = response.get_json()["item"]["_id"]
+        _, elapsed = timed(client.get, f"/retrieve/{ROUTE}/{item_id}/")
+        latencies["retrieve"].append(elapsed)
+        _, elapsed = timed(client.patch, f"/update/{ROUTE}/{item_id}/", json={"app_status": "Approved"})
+        latencies["update"].append(elapsed)
+        _, elapsed = timed(client.delete, f"/delete/{ROUTE}/{item_id}/")
+        latencies["delete"].append(elapsed)
+    return latencies
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help="create/retrieve/update/delete cycles per mode")
+    args = parser.parse_args()
+
+    client = flask_app.app.test_client()
+    shared_get = flask_app.registry.get
+
+    flask_app.registry.get = _per_request_get
+    before = run(client, args.requests)
+    flask_app.registry.get = shared_get
+    after = run(client, args.requests)
+
+    print_latencies("Before (handlers built per request)", before)
+    print_latencies("After (shared HandlerRegistry)", after)
@@ -0,0 +1,78 @@
+"""
+Write-path latency of CollectionPoster and CollectionUpdater before and after removing the
+read-after-write round trip.
+
+"before" replays the old write path (insert_one/update_one followed by find_one and a
+decrypt of the stored document); "after" uses the current handlers. Point it at a local
+mongod to see the round trip cost without network noise:
+
+    python benchmarks/write_latency.py --uri mongodb://localhost:27017/ --requests 1000
+"""
+import argparse
+import uuid
+from flask import Flask, jsonify
+from pymongo import MongoClient
+from common import print_latencies, timed
+from helpers import CollectionPoster, CollectionUpdater
+from managers import EncryptionKeyManager
+from validation import DataValidator
+import functions
+
+COLLECTION = 'applications'
+
+
+class LegacyPoster(CollectionPoster):
+    def handle_item(self, item: dict):
+        validated_data = self._encrypt_item(self._validate(item))
+        validated_data['_id'] = str(uuid.uuid4())
+        result = self.collection.insert_one(validated_data)
+        db_item = self.collection.find_one(validated_data['_id'])
+        return jsonify({"success": result.acknowledged, "item": self._decrypt_item(db_item)}), 201
+
+
+class LegacyUpdater(CollectionUpdater):
+    def handle_item(self, item_id: str, data: dict):
+        result = self.collection.update_one({"_id": item_id}, {"$set": self._encrypt_item(self._validate(data))})
+        item = self.collection.find_one({"_id": item_id})
+        return jsonify({"success": result.acknowledged, "item": self._decrypt_item(item)}), 200
+
+
+def run(poster, updater, n_requests: int) -> dict:
+    latencies = {"create": [], "update": []}
+    users = functions.generate_uuids(n_requests)
+    payloads = functions.generate_application(uuids={"applications": users, "users": users})
+    for payload in payloads:
+        payload.pop("_id")
+        (response, _), elapsed = timed(poster.handle_item, item=payload)
+        latencies["create"].append(elapsed)
+        item_id = response.get_json()["item"]["_id"]
+        _, elapsed = timed(updater.handle_item, item_id=item_id, data={"app_status": "Approved"})
+        latencies["update"].append(elapsed)
+    return latencies
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default='mongodb://localhost:27017/')
+    parser.add_argument('--database', default='write_latency_benchmark')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--w', default=1, help="write concern 'w' option")
+    parser.add_argument('--j', action='store_true', help="request journal acknowledgement")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    em = EncryptionKeyManager('encryption_key.key')
+    w = int(args.w) if str(args.w).isdigit() else args.w
+    options = dict(client=client, database=args.database, collection=COLLECTION, encryption_manager=em,
+                   is_encrypted=True, write_concern={"w": w, "j": args.j})
+    create_validator, update_validator = DataValidator('schema'), DataValidator('schema', update=True)
+
+    with Flask(__name__).app_context():
+        before = run(LegacyPoster(data_validator=create_validator, **options),
+                     LegacyUpdater(data_validator=update_validator, **options), args.requests)
+        after = run(CollectionPoster(data_validator=create_validator, **options),
+                    CollectionUpdater(data_validator=update_validator, **options), args.requests)
+    client.drop_database(args.database)
+
+    print_latencies("Before (write + find_one)", before)
+    print_latencies("After (single round trip)", after)
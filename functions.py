@@ -5,6 +5,113 @@ from datetime import datetime, timedelta
 
 fake = Faker()
 
+# Faker-backed fields that can be served from a `FakerPool`, keyed by document field.
+FAKER_PROVIDERS = {
+    "full_name": lambda: fake.name(),
+    "first_name": lambda: fake.first_name(),
+    "last_name": lambda: fake.last_name(),
+    "middle_name": lambda: fake.first_name(),
+    "birth_date": lambda: fake.date_of_birth(minimum_age=18, maximum_age=65).strftime('%Y-%m-%d'),
+    "valid_id_number": lambda: fake.ssn(),
+    "self_picture": lambda: fake.image_url(),
+    "current_add": lambda: fake.address(),
+    "permanent_add": lambda: fake.address(),
+    "company_working": lambda: fake.company(),
+    "job_title": lambda: fake.job(),
+    "payslip": lambda: fake.file_path(extension="pdf"),
+    "email": lambda: fake.email(),
+    "phone_number": lambda: fake.phone_number(),
+    "tel_number": lambda: fake.phone_number(),
+    "bank_name": lambda: fake.company(),
+    "notes": lambda: fake.text(max_nb_chars=100),
+}
+
+
+class FakerPool:
+    """
+    Values drawn from each Faker provider once up front, so rows can be built by sampling.
+
+    Attributes:
+        size (int): How many values are pre-drawn per field.
+        unique_fields (tuple): Fields that keep calling Faker for every row, with values that
+            are not repeated within a shard (e.g. `valid_id_number`). Shards are generated
+            independently, so values may still repeat across shards.
+        seed (int): The seed Faker was reset to before filling the pool, if any.
+        values (dict): The pre-drawn values, one list per field.
+        max_retries (int): Repeated values of a unique field tolerated in a row before giving up.
+    """
+
+    def __init__(self, size: int, unique_fields=("valid_id_number",), seed=None):
+        self.size = size
+        self.unique_fields = tuple(unique_fields)
+        self.seed = seed
+        if seed is not None:
+            reseed(seed)
+        self.values = {field: [provider() for _ in range(size)]
+                       for field, provider in FAKER_PROVIDERS.items() if field not in self.unique_fields}
+
+    max_retries = 1000
+
+    def sample(self, field: str, n: int) -> list:
+        """
+        Return `n` values for `field`, sampled from the pool unless the field is unique.
+
+        Raises:
+            ValueError: If Faker keeps repeating the values of a unique field.
+        """
+        if field in self.unique_fields:
+            return self._distinct(field, n)
+        return random.choices(self.values[field], k=n)
+
+    def _distinct(self, field: str, n: int) -> list:
+        """Call Faker for `n` values of `field`, drawing again whenever a value repeats."""
+        provider = FAKER_PROVIDERS[field]
+        values = []
+        seen = set()
+        retries = 0
+        while len(values) < n:
+            value = provider()
+            if value in seen:
+                retries += 1
+                if retries > self.max_retries:
+                    raise ValueError(f"Faker repeated {field} {retries} times, cannot draw {n} distinct values")
+                continue
+            retries = 0
+            seen.add(value)
+            values.append(value)
+        return values
+
+
+# The pool used by this process, or None to call Faker for every row.
+pool = None
+
+
+def configure_pool(size=None, unique_fields=("valid_id_number",), seed=None):
+    """Build (or drop, when `size` is None) this process's Faker pool, reusing an identical one."""
+    global pool
+    if size is None:
+        pool = None
+    elif pool is None or (pool.size, pool.unique_fields, pool.seed) != (size, tuple(unique_fields), seed):
+        pool = FakerPool(size=size, unique_fields=unique_fields, seed=seed)
+
+
+def faker_column(field: str, n: int) -> list:
+    """Return `n` values for a Faker-backed field, from the pool when one is configured."""
+    if pool is not None:
+        return pool.sample(field, n)
+    provider = FAKER_PROVIDERS[field]
+    return [provider() for _ in range(n)]
+
+
+# When set, timestamps are drawn relative to this moment instead of the current time, so that
+# the same seed reproduces them as well.
+reference_time = None
+
+
+def now() -> datetime:
+    """Return the moment timestamps are generated relative to."""
+    return reference_time or datetime.now()
+
 
 def random_date(start, end):
     """Generate a random date between `start` and `end`."""
@@ -13,15 +120,74 @@ def random_date(start, end):
     )
 
 
-def generate_uuids(num_ids):
-    uuid_list = [str(uuid.uuid4()) for i in range(num_ids)]
+def reseed(seed: int):
+    """Seed this process's `random` module and Faker instance."""
+    random.seed(seed)
+    fake.seed_instance(seed)
+
+
+def chunked(rows, chunk_size: int):
+    """Group an iterable of documents into lists of at most `chunk_size` documents."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _collect(rows, chunk_size=None):
+    """Return `rows` as one list, or as a generator of chunks when `chunk_size` is set."""
+    if chunk_size is None:
+        return list(rows)
+    return chunked(rows, chunk_size)
+
+
+def random_uuid(rng=random) -> str:
+    """Draw a version 4 UUID string from `rng`, so reseeding reproduces the same IDs."""
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def generate_uuids(num_ids, rng=random):
+    uuid_list = [random_uuid(rng) for i in range(num_ids)]
     return uuid_list
 
 
-def generate_user_profile(uuids: list) -> list:
-    profiles = []
+def _iter_pooled_user_profiles(uuids: list):
+    n = len(uuids)
+    columns = {field: faker_column(field, n) for field in
+               ("full_name", "first_name", "last_name", "middle_name", "birth_date", "valid_id_number",
+                "self_picture", "current_add", "permanent_add", "company_working", "job_title", "payslip")}
+    for i in range(n):
+        yield {
+            "_id": uuids[i],
+            "full_name": columns["full_name"][i],
+            "first_name": columns["first_name"][i],
+            "last_name": columns["last_name"][i],
+            "middle_name": columns["middle_name"][i],
+            "birth_date": columns["birth_date"][i],
+            "valid_id_type": random.choice(["Passport", "Driver's License", "National ID"]),
+            "valid_id_number": columns["valid_id_number"][i],
+            "self_picture": columns["self_picture"][i],
+            "current_add": columns["current_add"][i],
+            "permanent_add": columns["permanent_add"][i],
+            "employment_status": random.choice(["Employed", "Self-Employed", "Unemployed"]),
+            "company_working": columns["company_working"][i],
+            "job_title": columns["job_title"][i],
+            "income_source": random.choice(["Salary", "Business", "Investment", "Other"]),
+            "payslip": columns["payslip"][i],
+            "updated": now().isoformat()
+        }
+
+
+def iter_user_profiles(uuids: list):
+    if pool is not None:
+        yield from _iter_pooled_user_profiles(uuids)
+        return
     for i in range(len(uuids)):
-        profile = {
+        yield {
             "_id": uuids[i],
             "full_name": fake.name(),
             "first_name": fake.first_name(),
@@ -38,97 +204,122 @@ def generate_user_profile(uuids: list) -> list:
             "job_title": fake.job(),
             "income_source": random.choice(["Salary", "Business", "Investment", "Other"]),
             "payslip": fake.file_path(extension="pdf"),
-            "updated": datetime.now().isoformat()
+            "updated": now().isoformat()
         }
-        profiles.append(profile)
-    return profiles
 
 
-def generate_application(uuids: dict) -> list:
-    applications = []
+def generate_user_profile(uuids: list, chunk_size=None):
+    return _collect(iter_user_profiles(uuids), chunk_size)
+
+
+def iter_applications(uuids: dict):
     for i in range(len(uuids['applications'])):
-        application = {
+        yield {
             "_id": uuids['applications'][i],
             "user_profile": uuids['users'][i],
-            "date_submitted": random_date(datetime.now() - timedelta(days=730), datetime.now()).isoformat(),
+            "date_submitted": random_date(now() - timedelta(days=730), now()).isoformat(),
             "app_status": random.choice(["Pending", "Approved", "Rejected"]),
             "mode": random.choice(["Online", "In-Person"]),
-            "notes": fake.text(max_nb_chars=100),
+            "notes": fake.text(max_nb_chars=100) if pool is None else pool.sample("notes", 1)[0],
             "apply_attempt": random.choice([1, 2, 3]),
-            "updated": datetime.now().isoformat()
+            "updated": now().isoformat()
         }
-        applications.append(application)
 
-    return applications
+
+def generate_application(uuids: dict, chunk_size=None):
+    return _collect(iter_applications(uuids), chunk_size)
+
+
+def _iter_pooled_contact_info(num_entries: int, user_ids: list):
+    emails = faker_column("email", num_entries)
+    phone_numbers = faker_column("phone_number", num_entries)
+    tel_numbers = faker_column("tel_number", num_entries)
+    for i in range(num_entries):
+        yield {
+            "_id": random_uuid(),
+            "user_profile": user_ids[i],
+            "email": emails[i],
+            "phone_number": phone_numbers[i],
+            "tel_number": tel_numbers[i],
+            "updated": now().isoformat()
+        }
 
 
-def generate_contact_info(num_entries: int, user_ids: list) -> list:
-    contacts = []
+def iter_contact_info(num_entries: int, user_ids: list):
+    if pool is not None:
+        yield from _iter_pooled_contact_info(num_entries, user_ids)
+        return
     for i in range(num_entries):
-        contact = {
-            "_id": str(uuid.uuid4()),
+        yield {
+            "_id": random_uuid(),
             "user_profile": user_ids[i],
             "email": fake.email(),
             "phone_number": fake.phone_number(),
             "tel_number": fake.phone_number(),
-            "updated": datetime.now().isoformat()
+            "updated": now().isoformat()
         }
-        contacts.append(contact)
-    return contacts
 
 
-def generate_banking_info(num_entries: int, application_ids: list) -> list:
-    bank_info = []
+def generate_contact_info(num_entries: int, user_ids: list, chunk_size=None):
+    return _collect(iter_contact_info(num_entries, user_ids), chunk_size)
+
+
+def iter_banking_info(num_entries: int, application_ids: list):
     for i in range(num_entries):
-        info = {
-            "_id": str(uuid.uuid4()),
+        yield {
+            "_id": random_uuid(),
             "application_id": application_ids[i],
-            "bank_name": fake.company(),
+            "bank_name": fake.company() if pool is None else pool.sample("bank_name", 1)[0],
             "account_type": random.choice(["Savings", "Checking"]),
             "account_number": random.randint(10000000, 99999999),
             "bank_status": random.choice(["Active", "Inactive"])
         }
-        bank_info.append(info)
-    return bank_info
 
 
-def generate_financial_info(num_entries: int, application_ids: list) -> list:
-    finances = []
+def generate_banking_info(num_entries: int, application_ids: list, chunk_size=None):
+    return _collect(iter_banking_info(num_entries, application_ids), chunk_size)
+
+
+def iter_financial_info(num_entries: int, application_ids: list):
     for i in range(num_entries):
-        finance = {
-            "_id": str(uuid.uuid4()),
+        yield {
+            "_id": random_uuid(),
             "application_id": application_ids[i],
             "income": round(random.uniform(20000, 200000), 2),
             "net_assets": round(random.uniform(50000, 500000), 2),
             "net_debt": round(random.uniform(0, 200000), 2),
-            "updated": datetime.now().isoformat()
+            "updated": now().isoformat()
         }
-        finances.append(finance)
-    return finances
 
 
-def generate_credit_account(uuids: list) -> list:
-    accounts = []
+def generate_financial_info(num_entries: int, application_ids: list, chunk_size=None):
+    return _collect(iter_financial_info(num_entries, application_ids), chunk_size)
+
+
+def iter_credit_accounts(uuids: list, user_ids: list):
     for i in range(len(uuids)):
-        account = {
-            "_id": str(uuid.uuid4()),
-            "user_id": uuids[i],
+        yield {
+            "_id": uuids[i],
+            "user_id": user_ids[i],
             "credit_score": random.randint(300, 850),
-            "updated": datetime.now().isoformat()
+            "updated": now().isoformat()
         }
-        accounts.append(account)
-    return accounts
 
 
-def generate_credit_transactions(num_entries: int, ca_ids: list) -> list:
-    transactions = []
+def generate_credit_account(uuids: list, user_ids: list, chunk_size=None):
+    return _collect(iter_credit_accounts(uuids, user_ids), chunk_size)
+
+
+def iter_credit_transactions(num_entries: int, ca_ids: list):
     for i in range(num_entries):
-        transaction = {
-            "_id": str(uuid.uuid4()),
+        yield {
+            "_id": random_uuid(),
             "account_id": random.choice(ca_ids),
             "amount": round(random.uniform(50, 5000), 2),
-            "created": random_date(datetime.now() - timedelta(days=365), datetime.now()).isoformat(),
-            "updated": datetime.now().isoformat()
+            "created": random_date(now() - timedelta(days=365), now()).isoformat(),
+            "updated": now().isoformat()
         }
-        transactions.append(transaction)
-    return transactions
+
+
+def generate_credit_transactions(num_entries: int, ca_ids: list, chunk_size=None):
+    return _collect(iter_credit_transactions(num_entries, ca_ids), chunk_size)
@@ -1,52 +1,451 @@
+import hashlib
 import json
 import os
+import uuid
+from collections import deque
+from collections.abc import Sequence
+from itertools import islice
+from multiprocessing import Pool
+import functions
 from functions import *
+from writers import open_writer
+
+
+# ID lists shared with the current process, set once per worker by `_init_worker`
+# so that every shard does not have to pickle them again.
+_shared_uuids = {}
+
+# Builds one shard of a collection with the given backend module from the shared ID
+# lists and a [start, stop) range.
+_SHARD_GENERATORS = {
+    "user_profiles": lambda gen, uuids, start, stop: gen.generate_user_profile(uuids=uuids['users'][start:stop]),
+    "applications": lambda gen, uuids, start, stop: gen.generate_application(
+        uuids={"applications": uuids['applications'][start:stop], "users": uuids['users'][start:stop]}),
+    "contact_info": lambda gen, uuids, start, stop: gen.generate_contact_info(
+        num_entries=stop - start, user_ids=uuids['users'][start:stop]),
+    "banking_info": lambda gen, uuids, start, stop: gen.generate_banking_info(
+        num_entries=stop - start, application_ids=uuids['applications'][start:stop]),
+    "financial_info": lambda gen, uuids, start, stop: gen.generate_financial_info(
+        num_entries=stop - start, application_ids=uuids['applications'][start:stop]),
+    "credit_accounts": lambda gen, uuids, start, stop: gen.generate_credit_account(
+        uuids=uuids['credit_accounts'][start:stop], user_ids=uuids['users'][start:stop]),
+    "credit_transactions": lambda gen, uuids, start, stop: gen.generate_credit_transactions(
+        num_entries=stop - start, ca_ids=uuids['credit_accounts']),
+}
+
+
+def _backend(name: str):
+    """Return the generator module for a backend name. NumPy is only imported when asked for."""
+    if name == 'python':
+        return functions
+    if name == 'numpy':
+        import vectorized
+        return vectorized
+    raise ValueError(f"Unknown generation backend: {name}")
+
+
+def _init_worker(uuids, pool_settings=None, reference_time=None):
+    global _shared_uuids
+    _shared_uuids = uuids
+    configure_pool(**(pool_settings or {}))
+    functions.reference_time = reference_time
+
+
+def _generate_shard(task):
+    collection, start, stop, seed, backend, per_record = task
+    gen = _backend(backend)
+    if per_record:
+        return [generate_record(gen, _shared_uuids, seed, collection, index) for index in range(start, stop)]
+    gen.reseed(seed)
+    return _SHARD_GENERATORS[collection](gen, _shared_uuids, start, stop)
+
+
+def generate_record(gen, uuids: dict, seed: int, collection: str, index: int) -> dict:
+    """Generate record `index` of `collection` from a seed of its own, independently of every other record."""
+    gen.reseed(derive_seed(seed, collection, index))
+    return _SHARD_GENERATORS[collection](gen, uuids, index, index + 1)[0]
+
+
+def derive_seed(seed: int, collection: str, shard: int) -> int:
+    """Derive a stable per-shard seed so output does not depend on which worker ran the shard."""
+    digest = hashlib.sha256(f"{seed}:{collection}:{shard}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class RecordIds(Sequence):
+    """
+    The `_id`s of a collection's records, each derived from (seed, kind, index) when it is read
+    instead of being drawn in order and stored.
+
+    Attributes:
+        seed (int): The base seed.
+        kind (str): Which IDs these are ('applications', 'users' or 'credit_accounts').
+        size (int): The number of IDs.
+    """
+
+    def __init__(self, seed: int, kind: str, size: int):
+        self.seed = seed
+        self.kind = kind
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f"{self.kind} ID index out of range")
+        digest = hashlib.sha256(f"{self.seed}:{self.kind}:{index}".encode('utf-8')).digest()
+        return str(uuid.UUID(bytes=digest[:16], version=4))
 
 
 class DataGenerator:
     n_applications = None
     credit_transaction_size = None
+    chunk_size = None
+    workers = 1
+    seed = None
+    backend = 'python'
+    pool_size = None
+    unique_fields = ("valid_id_number",)
+    shard_size = 10000
     uuids = {}
     output_dir = 'data'
+    output_format = 'json'
+    per_record = False
+    reference_time = None
 
-    def __init__(self, n_applications, credit_transaction_size=20):
+    def __init__(self, n_applications, credit_transaction_size=20, chunk_size=None, workers=1, seed=None,
+                 backend='python', pool_size=None, unique_fields=("valid_id_number",), output_format='json',
+                 per_record=False, reference_time=None):
+        """
+        Args:
+            n_applications (int): How many applications (and user profiles) to generate.
+            credit_transaction_size (int): How many credit card transactions to generate.
+            chunk_size (int, optional): When set, every collection is generated lazily in
+                chunks of this many documents instead of as one in-memory list.
+            workers (int, optional): Number of processes to generate shards in. Defaults to 1.
+            seed (int, optional): Base seed that every shard's seed is derived from.
+                A random one is picked when omitted.
+            backend (str, optional): 'python' draws every field row by row, 'numpy' draws
+                numeric, categorical and timestamp columns in bulk. Defaults to 'python'.
+            pool_size (int, optional): When set, Faker fields are sampled from pools of this
+                many pre-generated values instead of calling Faker for every row.
+            unique_fields (tuple, optional): Faker fields that are still generated per row
+                in pool mode. Defaults to ("valid_id_number",).
+            output_format (str, optional): Format of the files written to `output_dir`, one of
+                `writers.WRITERS`: 'json' (a pretty-printed array), 'ndjson', 'ndjson.gz',
+                'ndjson.zst', 'bson' or 'parquet'. Defaults to 'json'.
+            per_record (bool, optional): Derive every record, IDs included, from (seed, collection,
+                index) alone, so any record or slice can be regenerated on its own with `record`
+                or `records`. Slower than seeding whole shards. Defaults to False.
+            reference_time (str or datetime, optional): Generate timestamps relative to this moment
+                instead of the current time, so they are reproducible too.
+        """
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
         self.n_applications = n_applications
         self.credit_transaction_size = credit_transaction_size
-        self.uuids['applications'] = generate_uuids(num_ids=n_applications)
-        self.uuids['users'] = generate_uuids(num_ids=n_applications)
-        self.uuids['credit_accounts'] = generate_uuids(num_ids=random.randint(1, n_applications))
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.backend = backend
+        self.pool_size = pool_size
+        self.unique_fields = tuple(unique_fields)
+        self.output_format = output_format
+        self.per_record = per_record
+        if isinstance(reference_time, str):
+            reference_time = datetime.fromisoformat(reference_time)
+        self.reference_time = reference_time
+        _backend(backend)
+        n_credit_accounts = random.Random(self.seed).randint(1, n_applications)
+        if per_record:
+            self.uuids = {kind: RecordIds(self.seed, kind, size) for kind, size in
+                          (("applications", n_applications), ("users", n_applications),
+                           ("credit_accounts", n_credit_accounts))}
+            return
+        # IDs are drawn from the seed too, so regenerating with the same seed (e.g. to resume a
+        # load) produces documents with the same `_id`s.
+        id_rng = random.Random(derive_seed(self.seed, "uuids", 0))
+        self.uuids = {}
+        self.uuids['applications'] = generate_uuids(num_ids=n_applications, rng=id_rng)
+        self.uuids['users'] = generate_uuids(num_ids=n_applications, rng=id_rng)
+        self.uuids['credit_accounts'] = generate_uuids(num_ids=n_credit_accounts, rng=id_rng)
+
+    def _pool_settings(self) -> dict:
+        # Every process fills its pool from the same seed so results do not depend on `workers`.
+        return {"size": self.pool_size, "unique_fields": self.unique_fields,
+                "seed": derive_seed(self.seed, "faker_pool", 0)}
+
+    def _tasks(self, collection: str, total: int) -> list:
+        # Shard boundaries must not depend on `workers`, otherwise the derived seeds would.
+        size = self.chunk_size or self.shard_size
+        return [(collection, start, min(start + size, total),
+                 self.seed if self.per_record else derive_seed(self.seed, collection, shard),
+                 self.backend, self.per_record)
+                for shard, start in enumerate(range(0, total, size))]
+
+    def _generate_collection(self, collection: str, total: int):
+        """
+        Yield the shards of `collection` in order, generating them in a process pool if enabled.
+
+        At most `workers * 2` shards are submitted ahead of the one being consumed, so a slow
+        consumer (e.g. a streaming load) does not make the pool buffer the whole collection.
+        """
+        tasks = self._tasks(collection, total)
+        if self.workers > 1 and len(tasks) > 1:
+            with Pool(processes=self.workers, initializer=_init_worker,
+                      initargs=(self.uuids, self._pool_settings(), self.reference_time)) as process_pool:
+                pending = deque()
+                tasks = iter(tasks)
+                for task in islice(tasks, self.workers * 2):
+                    pending.append(process_pool.apply_async(_generate_shard, (task,)))
+                while pending:
+                    shard = pending.popleft().get()
+                    for task in islice(tasks, 1):
+                        pending.append(process_pool.apply_async(_generate_shard, (task,)))
+                    yield shard
+        else:
+            _init_worker(self.uuids, self._pool_settings(), self.reference_time)
+            for task in tasks:
+                yield _generate_shard(task)
+
+    def record(self, collection: str, index: int) -> dict:
+        """
+        Regenerate record `index` of `collection` without generating any other record.
+
+        Raises:
+            ValueError: If the generator was not created with `per_record`.
+        """
+        return self.records(collection, index, index + 1)[0]
+
+    def records(self, collection: str, start: int, stop: int) -> list:
+        """
+        Regenerate records [start, stop) of `collection`, e.g. one slice of a dataset that is
+        generated across several machines.
+
+        Raises:
+            ValueError: If the generator was not created with `per_record`.
+        """
+        if not self.per_record:
+            raise ValueError("Records can only be regenerated on their own with per_record=True")
+        _init_worker(self.uuids, self._pool_settings(), self.reference_time)
+        return _generate_shard((collection, start, stop, self.seed, self.backend, True))
+
+    def _collection_sizes(self) -> dict:
+        return {
+            "user_profiles": self.n_applications,
+            "applications": self.n_applications,
+            "contact_info": self.n_applications,
+            "banking_info": self.n_applications,
+            "financial_info": self.n_applications,
+            "credit_accounts": len(self.uuids['credit_accounts']),
+            "credit_transactions": self.credit_transaction_size,
+        }
 
     def _generate_data(self) -> dict:
-        data = {
-            "user_profiles": generate_user_profile(uuids=self.uuids['users']),
-            "applications": generate_application(uuids=self.uuids),
-            "contact_info": generate_contact_info(num_entries=self.n_applications,
-                                                  user_ids=self.uuids['users']),
-            "banking_info": generate_banking_info(num_entries=self.n_applications,
-                                                  application_ids=self.uuids['applications']),
-            "financial_info": generate_financial_info(num_entries=self.n_applications,
-                                                      application_ids=self.uuids['applications']),
-            "credit_accounts": generate_credit_account(uuids=self.uuids['credit_accounts']),
-            "credit_transactions": generate_credit_transactions(num_entries=self.credit_transaction_size,
-                                                                ca_ids=self.uuids['credit_accounts'])
-            }
-        # user_profiles = generate_user_profile(uuids=self.uuids['users'])
-        # applications = generate_application(uuids=self.uuids)
+        data = {}
+        for collection, total in self._collection_sizes().items():
+            shards = self._generate_collection(collection, total)
+            if self.chunk_size is not None:
+                data[collection] = shards
+            else:
+                data[collection] = [document for shard in shards for document in shard]
         return data
 
+    def _path(self, timestamp: str, collection: str) -> str:
+        return os.path.join(self.output_dir, f"{timestamp}_{collection}_data.{self.output_format}")
+
     def _load_data(self, data) -> None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         for collection in data:
-            filename = f"{timestamp}_{collection}_data.json"
-            path = os.path.join(self.output_dir, filename)
-            with open(path, 'w+', encoding='utf-8') as f:
-                json.dump(data[collection], f, ensure_ascii=False, indent=4)
+            with open_writer(self.output_format, self._path(timestamp, collection)) as writer:
+                writer.write(data[collection])
+            print(writer.report())
+
+    def _stream_collection(self, path, chunks):
+        """
+        Write chunks to `path` as they pass through, yielding each chunk to the caller.
+
+        The file has the same layout as the one written by `_load_data`, but it is only
+        complete once the caller has consumed every chunk.
+        """
+        with open_writer(self.output_format, path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+                yield chunk
+        print(writer.report())
+
+    def _stream_data(self, data) -> dict:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return {collection: self._stream_collection(self._path(timestamp, collection), data[collection])
+                for collection in data}
 
     def start(self) -> dict:
+        """
+        Generate the dataset and write it to `output_dir`.
+
+        Returns:
+            dict: A mapping of collection name to its documents. In streaming mode
+            (`chunk_size` set) each value is a generator of document chunks that writes
+            to disk as it is consumed, so peak memory is bounded by the chunk size.
+        """
         data = self._generate_data()
+        if self.chunk_size is not None:
+            return self._stream_data(data)
         self._load_data(data)
 
         return data
+
+
+class DeltaGenerator:
+    """
+    Generates the changes to an existing dataset tick by tick, instead of a whole new dataset, so
+    growing a loaded dataset costs in proportion to the change rather than to its size.
+
+    Every tick adds `applications` applications from existing users (with their banking and
+    financial info), adds `credit_transactions` transactions against existing credit accounts, and
+    refreshes the `updated` timestamp of existing records at the rates in `updates`.
+
+    Attributes:
+        ids (dict): The existing `_id`s of 'users', 'applications' and 'credit_accounts'. New
+            applications are added to it as they are generated.
+        applications (int): New applications per tick.
+        credit_transactions (int): New credit transactions per tick.
+        updates (dict): Collection ('user_profiles', 'applications' or 'credit_accounts') to the
+            number of its records whose `updated` timestamp is refreshed per tick.
+        seed (int): Base seed every tick's seed is derived from.
+        backend (str): 'python' or 'numpy', as in DataGenerator.
+        output_format (str): Format of the delta files, as in DataGenerator.
+        output_dir (str): Where the delta files are written, apart from full datasets.
+        ticks_path (str): Where the next tick number of each seed is kept, so a rerun with the same
+            seed continues from the last loaded tick instead of regenerating its `_id`s.
+    """
+
+    # The ID list each updatable collection's records are picked from.
+    update_ids = {"user_profiles": "users", "applications": "applications", "credit_accounts": "credit_accounts"}
+    output_dir = os.path.join('data', 'deltas')
+    ticks_path = os.path.join('data', 'deltas', 'ticks.json')
+
+    def __init__(self, ids: dict, applications=0, credit_transactions=0, updates=None, seed=None,
+                 backend='python', output_format='json'):
+        for kind in ("users", "applications", "credit_accounts"):
+            if not ids.get(kind):
+                raise ValueError(f"The existing dataset has no {kind} to generate deltas against")
+        unknown = set(updates or {}) - set(self.update_ids)
+        if unknown:
+            raise ValueError(f"Cannot update {', '.join(sorted(unknown))}, expected one of {', '.join(self.update_ids)}")
+        self.ids = {kind: list(ids[kind]) for kind in ("users", "applications", "credit_accounts")}
+        self.applications = applications
+        self.credit_transactions = credit_transactions
+        self.updates = updates or {}
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.backend = backend
+        self.output_format = output_format
+        _backend(backend)
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+    @classmethod
+    def from_dataset(cls, source, **kwargs):
+        """Create a generator for the dataset in a directory or list of data files (see `readers.open_dataset`)."""
+        from readers import open_dataset
+        dataset = open_dataset(source, chunk_size=10000)
+        ids = {kind: [document["_id"] for chunk in dataset.get(collection, []) for document in chunk]
+               for kind, collection in (("users", "user_profiles"), ("applications", "applications"),
+                                        ("credit_accounts", "credit_accounts"))}
+        return cls(ids, **kwargs)
+
+    @classmethod
+    def from_mongo(cls, database, **kwargs):
+        """Create a generator for the dataset loaded in a pymongo database, reading only the `_id` index."""
+        ids = {kind: [document["_id"] for document in database[collection].find({}, {"_id": 1})]
+               for kind, collection in (("users", "user_profiles"), ("applications", "applications"),
+                                        ("credit_accounts", "credit_accounts"))}
+        return cls(ids, **kwargs)
+
+    def _ticks(self) -> dict:
+        """Return this seed's progress: the number of ticks whose inserts, and whose updates too, are loaded."""
+        if not os.path.exists(self.ticks_path):
+            return {"inserted": 0, "loaded": 0}
+        with open(self.ticks_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(str(self.seed), {"inserted": 0, "loaded": 0})
+
+    def _record(self, stage: str, number: int):
+        ticks = {}
+        if os.path.exists(self.ticks_path):
+            with open(self.ticks_path, 'r', encoding='utf-8') as f:
+                ticks = json.load(f)
+        progress = ticks.setdefault(str(self.seed), {"inserted": 0, "loaded": 0})
+        progress[stage] = max(progress[stage], number + 1)
+        temporary = f"{self.ticks_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(ticks, f, indent=4)
+        os.replace(temporary, self.ticks_path)
+
+    def next_tick(self) -> int:
+        """Return the number of the first tick not yet loaded with this seed."""
+        return self._ticks()["loaded"]
+
+    def is_inserted(self, number: int) -> bool:
+        """Return whether tick `number`'s new documents are loaded, even if its updates are not."""
+        return number < self._ticks()["inserted"]
+
+    def inserted(self, number: int):
+        """Record that tick `number`'s new documents are loaded, so a rerun only applies its updates."""
+        self._record("inserted", number)
+
+    def loaded(self, number: int):
+        """Record that tick `number` is loaded, so the next run with this seed starts after it."""
+        self._record("inserted", number)
+        self._record("loaded", number)
+
+    def tick(self, number: int) -> tuple:
+        """
+        Generate the changes of one tick.
+
+        Args:
+            number (int): The tick number, which its seed is derived from. Continue from
+                `next_tick()` so a rerun with the same seed does not regenerate loaded records.
+
+        Returns:
+            tuple: The new documents per collection, and the `$set` updates (each with the `_id`
+            of the record it applies to) per collection.
+        """
+        gen = _backend(self.backend)
+        gen.reseed(derive_seed(self.seed, "delta", number))
+        inserts = {}
+        if self.applications:
+            # New applications come from randomly picked existing users.
+            uuids = {"applications": generate_uuids(self.applications),
+                     "users": random.choices(self.ids["users"], k=self.applications)}
+            inserts["applications"] = gen.generate_application(uuids=uuids)
+            inserts["banking_info"] = gen.generate_banking_info(self.applications, uuids["applications"])
+            inserts["financial_info"] = gen.generate_financial_info(self.applications, uuids["applications"])
+            self.ids["applications"].extend(uuids["applications"])
+        if self.credit_transactions:
+            inserts["credit_transactions"] = gen.generate_credit_transactions(
+                self.credit_transactions, self.ids["credit_accounts"])
+
+        updated = functions.now().isoformat()
+        updates = {}
+        for collection, count in self.updates.items():
+            ids = self.ids[self.update_ids[collection]]
+            updates[collection] = [{"_id": item_id, "updated": updated}
+                                   for item_id in random.sample(ids, min(count, len(ids)))]
+        return inserts, updates
+
+    def write(self, number: int, inserts: dict, updates: dict):
+        """Write a tick's new documents and updates to `output_dir`."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        for kind, data in (("inserts", inserts), ("updates", updates)):
+            for collection, documents in data.items():
+                path = os.path.join(self.output_dir,
+                                    f"{timestamp}_tick{number}_{kind}_{collection}.{self.output_format}")
+                with open_writer(self.output_format, path) as writer:
+                    writer.write(documents)
+                print(writer.report())
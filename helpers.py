@@ -1,7 +1,130 @@
+import json
+import threading
+import time
 import uuid
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from itertools import islice
 from flask import jsonify
-from pymongo import MongoClient
+from pymongo import MongoClient, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.write_concern import WriteConcern
+from validation import DataValidator
+
+
+class DocumentCache:
+    """
+    An in-process LRU cache of decrypted documents keyed by `_id`, with an optional time to live.
+
+    Entries are written and invalidated by the handlers of one collection, so reads served
+    from the cache never go stale within a process. Writes made by other processes are only
+    picked up once an entry expires.
+
+    Every write bumps a generation clock. Readers take the `generation()` before querying
+    MongoDB and pass it to `put`, which drops the document if the item was written since, so a
+    read that raced an update cannot cache the document it read before the update. Writers
+    only invalidate, and the next read caches the document again.
+
+    Attributes:
+        max_size (int): Most documents kept before the least recently used one is evicted.
+        ttl (float): Seconds an entry stays valid, or None to keep it until it is evicted.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that were not cached or had expired.
+        evictions (int): Entries dropped to stay within `max_size`.
+    """
+
+    def __init__(self, max_size=10000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        # The generation of each item's last write, the most recent `max_size` of them. Older
+        # writes are only remembered as `_forgotten`, the newest generation dropped from here.
+        self._written = OrderedDict()
+        self._forgotten = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def get(self, item_id):
+        """
+        Return a copy of the cached document, or None if it is not cached or has expired.
+
+        Args:
+            item_id (str): The `_id` of the document.
+        """
+        with self._lock:
+            entry = self._items.get(item_id)
+            if entry is None or (self.ttl is not None and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._items[item_id]
+                self.misses += 1
+                return None
+            self._items.move_to_end(item_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def generation(self) -> int:
+        """Return the current generation, to pass to `put` with a document read after this call."""
+        with self._lock:
+            return self._clock
+
+    def _write(self, item_id):
+        # Called with the lock held.
+        self._clock += 1
+        self._written[item_id] = self._clock
+        self._written.move_to_end(item_id)
+        while len(self._written) > self.max_size:
+            _, generation = self._written.popitem(last=False)
+            self._forgotten = max(self._forgotten, generation)
+
+    def put(self, item: dict, generation: int):
+        """
+        Cache a decrypted document read from MongoDB under its `_id`.
+
+        Writers only `invalidate`: two writes to one item can finish in either order, so the
+        document a writer holds is not necessarily the latest, while the next read is.
+
+        Args:
+            item (dict): The decrypted document. Anything else (e.g. an error response) is ignored.
+            generation (int): The `generation()` taken before the read. The document is not
+                cached if the item was written since.
+        """
+        if not isinstance(item, dict) or "_id" not in item:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if self._written.get(item["_id"], self._forgotten) > generation:
+                return
+            self._items[item["_id"]] = (expires, dict(item))
+            self._items.move_to_end(item["_id"])
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *item_ids):
+        """
+        Drop documents from the cache.
+
+        Args:
+            *item_ids (str): The `_id` of each document to drop.
+        """
+        with self._lock:
+            for item_id in item_ids:
+                self._items.pop(item_id, None)
+                self._write(item_id)
+
+    def stats(self) -> dict:
+        """
+        Return the cache's size and hit/miss metrics.
+
+        Returns:
+            dict: `size`, `max_size`, `hits`, `misses`, `evictions` and `hit_ratio`.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._items), "max_size": self.max_size, "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_ratio": self.hits / lookups if lookups else 0.0}
 
 
 class CollectionHandler(ABC):
@@ -15,6 +138,8 @@ class CollectionHandler(ABC):
         data_validator (object): An optional data validator for validating input data.
         encryption_manager (object): An optional encryption manager for encrypting and decrypting data.
         is_encrypted (bool): Indicates if the data in the collection is encrypted.
+        write_concern (dict): Write concern options (e.g. {"w": 1, "j": False}) for writes to the collection.
+        cache (DocumentCache): An optional cache of decrypted documents shared by the collection's handlers.
     """
 
     client = None
@@ -24,7 +149,7 @@ class CollectionHandler(ABC):
 
     def __init__(self, client: MongoClient, database: str, collection: str,
                  data_validator=None, encryption_manager=None,
-                 is_encrypted=False):
+                 is_encrypted=False, write_concern=None, cache=None):
         """
         Initialize the handler with a database, collection, and optional encryption manager.
 
@@ -35,14 +160,23 @@ class CollectionHandler(ABC):
             data_validator (object, optional): An object for validating data against schemas.
             encryption_manager (object, optional): An object for managing encryption and decryption.
             is_encrypted (bool, optional): Whether the collection data is encrypted. Defaults to False.
+            write_concern (dict, optional): Write concern options for the collection. Defaults to
+                the client's write concern.
+            cache (DocumentCache, optional): A cache of decrypted documents to read through and
+                keep up to date. Defaults to no caching.
         """
         self.client = client
         self.database = self.client[database]
         self.collection_name = collection
-        self.collection = self.database[collection]
+        self.write_concern = write_concern
+        if write_concern is not None:
+            self.collection = self.database.get_collection(collection, write_concern=WriteConcern(**write_concern))
+        else:
+            self.collection = self.database[collection]
         self.data_validator = data_validator
         self.is_encrypted = is_encrypted
         self.encryption_manager = encryption_manager
+        self.cache = cache
 
 
     @abstractmethod
@@ -63,6 +197,36 @@ class CollectionHandler(ABC):
         """
         pass
 
+    def _encrypt_item(self, item: dict) -> dict:
+        """
+        Encrypt an item if encryption is enabled.
+
+        Args:
+            item (dict): The data item to encrypt.
+
+        Returns:
+            dict: A copy of the item with the fields the encryption policy names (by default every
+            field except `_id`) encrypted, or an unencrypted copy if encryption is not enabled.
+        """
+        if not self.is_encrypted or not self.encryption_manager:
+            return dict(item)
+        return self.encryption_manager.encrypt_document(item, collection=self.collection_name)
+
+    def _encrypt_items(self, items: list) -> list:
+        """
+        Encrypt many items at once if encryption is enabled.
+
+        Args:
+            items (list): The data items to encrypt.
+
+        Returns:
+            list: Encrypted copies of the items, in the same order.
+        """
+        if not self.is_encrypted or not self.encryption_manager:
+            return [dict(item) for item in items]
+        encrypt_document = self.encryption_manager.encrypt_document
+        return [encrypt_document(item, collection=self.collection_name) for item in items]
+
     def _decrypt_item(self, item: dict):
         """
         Decrypt an item if encryption is enabled.
@@ -76,19 +240,81 @@ class CollectionHandler(ABC):
         Raises:
             Exception: If decryption fails.
         """
-        if not self.is_encrypted or not self.encryption_manager:
+        if not self.is_encrypted or not self.encryption_manager or item is None:
             return item
 
-        encrypted_data = item
-        encrypted_data_id = encrypted_data.pop("_id")
         try:
-            decrypted_data = {"_id": encrypted_data_id}
-            for key, value in encrypted_data.items():
-                decrypted_data[key] = self.encryption_manager.decrypt(value)
+            decrypted_data = self.encryption_manager.decrypt_document(item, collection=self.collection_name)
         except Exception as e:
             return jsonify({"error": "Decryption failed", "details": str(e)}), 500
         return decrypted_data
 
+    def _decrypt_items(self, items) -> list:
+        """
+        Decrypt many items at once if encryption is enabled.
+
+        Args:
+            items (iterable): A list of data items or a pymongo cursor.
+
+        Returns:
+            list: The decrypted items, or the original items if decryption is not enabled.
+
+        Raises:
+            Exception: If decryption of any item fails.
+        """
+        if not self.is_encrypted or not self.encryption_manager:
+            return list(items)
+        return self.encryption_manager.decrypt_many(items, collection=self.collection_name)
+
+    def _is_packed(self) -> bool:
+        """Whether documents are stored as one encrypted payload, whose fields cannot be projected or set one by one."""
+        return bool(self.is_encrypted and self.encryption_manager
+                    and self.encryption_manager.policy.packed(self.collection_name))
+
+    def _projection(self, fields=None):
+        """Return the server-side projection for `fields`, or None when it has to be applied after decryption."""
+        if not fields or self._is_packed():
+            return None
+        return {field: 1 for field in fields}
+
+    def _select(self, items: list, fields=None) -> list:
+        """Trim decrypted packed documents down to `fields` (and `_id`)."""
+        if not fields or not self._is_packed():
+            return items
+        keep = {"_id", *fields}
+        return [{key: value for key, value in item.items() if key in keep} for item in items]
+
+    def _merge(self, current: dict, data: dict) -> tuple:
+        """
+        Apply an update to a stored packed document.
+
+        Args:
+            current (dict): The document as stored.
+            data (dict): The plaintext fields to set.
+
+        Returns:
+            tuple: The updated plaintext item and the encrypted document to replace `current` with.
+        """
+        item = {**self.encryption_manager.decrypt_document(current, collection=self.collection_name), **data}
+        return item, self._encrypt_item(item)
+
+    def _replacements(self, currents: list, items: list) -> list:
+        """
+        Build the replacements applying bulk updates to stored packed documents.
+
+        Each replacement only matches the document as it was read, so a concurrent write is not
+        overwritten; it shows up as a lower matched count instead.
+
+        Args:
+            currents (list): The stored documents being updated.
+            items (list): The updates, each holding the `_id` of the item and the fields to set.
+
+        Returns:
+            list: One ReplaceOne per stored document.
+        """
+        updates = {item["_id"]: item for item in items}
+        return [ReplaceOne(current, self._merge(current, updates[current["_id"]])[1]) for current in currents]
+
 
 class CollectionPoster(CollectionHandler):
     """
@@ -122,6 +348,9 @@ class CollectionPoster(CollectionHandler):
         """
         Insert an item into the collection.
 
+        The response is built from the validated plaintext rather than read back from the
+        database, so the insert costs a single round trip.
+
         Args:
             item (dict): The data item to insert.
 
@@ -129,16 +358,11 @@ class CollectionPoster(CollectionHandler):
             tuple: A Flask JSON response and HTTP status code.
         """
         validated_data = self._validate(item)
-        if self.is_encrypted:
-            encrypted_item = {}
-            for key, value in validated_data.items():
-                encrypted_item[key] = self.encryption_manager.encrypt(value)
-            validated_data = encrypted_item
-
-        validated_data['_id'] = str(uuid.uuid4())
-        result = self.collection.insert_one(validated_data)
-        db_item = self.collection.find_one(validated_data['_id'])
-        return jsonify({"success": result.acknowledged, "item": self._decrypt_item(db_item)}), 201
+        item_id = str(uuid.uuid4())
+        document = self._encrypt_item(validated_data)
+        document['_id'] = item_id
+        result = self.collection.insert_one(document)
+        return jsonify({"success": result.acknowledged, "item": {**validated_data, "_id": item_id}}), 201
 
 
 class CollectionGetter(CollectionHandler):
@@ -148,26 +372,42 @@ class CollectionGetter(CollectionHandler):
 
     def handle_item(self, item_id: str):
         """
-        Retrieve an item from the collection by its ID.
+        Retrieve an item from the collection by its ID, reading through the cache if one is set.
 
         Args:
             item_id (str): The ID of the item to retrieve.
 
         Returns:
-            dict: The retrieved item, decrypted if necessary.
+            dict: The retrieved item, decrypted if necessary, or a Flask JSON response and a 404
+            status code if no item has the given ID.
         """
+        generation = None
+        if self.cache is not None:
+            item = self.cache.get(item_id)
+            if item is not None:
+                return item
+            generation = self.cache.generation()
+
         item = self.collection.find_one({"_id": item_id})
         if self.is_encrypted:
-            return self._decrypt_item(item)
-        else:
-            return item
+            item = self._decrypt_item(item)
+        if self.cache is not None:
+            self.cache.put(item, generation=generation)
+        if item is None:
+            return jsonify({"error": f"{item_id} not found"}), 404
+        return item
 
 
 class CollectionUpdater(CollectionHandler):
     """
     A class for updating items in a MongoDB collection with optional validation and encryption.
+
+    Attributes:
+        max_retries (int): Attempts at replacing a packed document that is being written concurrently.
     """
 
+    max_retries = 3
+
     def _validate(self, data):
         """
         Validate the given data against the collection schema.
@@ -195,6 +435,9 @@ class CollectionUpdater(CollectionHandler):
         """
         Update an item in the collection.
 
+        The updated document is returned by `find_one_and_update`, so the update costs a
+        single round trip. `success` is False when no item has the given ID.
+
         Args:
             item_id (str): The ID of the item to update.
             data (dict): The new data for the item.
@@ -203,17 +446,37 @@ class CollectionUpdater(CollectionHandler):
             tuple: A Flask JSON response and HTTP status code.
         """
         validated_data = self._validate(data=data)
-        if self.is_encrypted:
-            encrypted_data = {}
-            for key, value in validated_data.items():
-                encrypted_data[key] = self.encryption_manager.encrypt(value)
-            result = self.collection.update_one({"_id": item_id}, {"$set": encrypted_data})
-            item = self.collection.find_one({"_id": item_id})
-            return jsonify({"success": result.acknowledged, "item": self._decrypt_item(item)}), 200
+        if self._is_packed():
+            item = self._replace_item(item_id, validated_data)
         else:
-            result = self.collection.update_one({"_id": item_id}, {"$set": validated_data})
-            item = self.collection.find_one({"_id": item_id})
-            return jsonify({"success": result.acknowledged, "item": item}), 200
+            item = self.collection.find_one_and_update({"_id": item_id}, {"$set": self._encrypt_item(validated_data)},
+                                                       return_document=ReturnDocument.AFTER)
+            item = self._decrypt_item(item)
+        if self.cache is not None:
+            self.cache.invalidate(item_id)
+        return jsonify({"success": item is not None, "item": item}), 200
+
+    def _replace_item(self, item_id: str, data: dict):
+        """
+        Update a packed document by reading, re-encrypting and replacing it.
+
+        The replacement only matches the document as it was read, and is retried up to
+        `max_retries` times if another write got there first.
+
+        Returns:
+            dict: The updated item, or None if no item has the given ID.
+
+        Raises:
+            RuntimeError: If the item kept changing between the read and the replacement.
+        """
+        for _ in range(self.max_retries):
+            current = self.collection.find_one({"_id": item_id})
+            if current is None:
+                return None
+            item, document = self._merge(current, data)
+            if self.collection.find_one_and_replace(current, document) is not None:
+                return item
+        raise RuntimeError(f"{item_id} was modified concurrently {self.max_retries} times")
 
 
 class CollectionDeleter(CollectionHandler):
@@ -233,6 +496,401 @@ class CollectionDeleter(CollectionHandler):
         """
         try:
             self.collection.delete_one({"_id": item_id})
+            if self.cache is not None:
+                self.cache.invalidate(item_id)
             return jsonify({"success": f"Deleted {item_id} from {self.collection.name}"}), 204
         except Exception as e:
             return jsonify({"error": "Deletion failed", "details": str(e)}), 500
+
+
+class CollectionLister(CollectionHandler):
+    """
+    A class for listing a MongoDB collection page by page using keyset pagination on `_id`.
+
+    Attributes:
+        page_size (int): Items per page when the request does not ask for a size.
+        max_page_size (int): Upper bound on the requested page size.
+    """
+
+    page_size = 100
+    max_page_size = 1000
+
+    def __init__(self, *args, page_size=100, max_page_size=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+
+    def handle_item(self, after=None, limit=None, fields=None, where=None):
+        """
+        Retrieve one page of items ordered by `_id`.
+
+        Args:
+            after (str, optional): Return items whose `_id` sorts after this one, i.e. the `next`
+                value of the previous page. Defaults to the first page.
+            limit (int, optional): Items per page, capped at `max_page_size`. Defaults to `page_size`.
+                Limits below 1 are rejected.
+            fields (list, optional): Only return these fields (and `_id`). Defaults to every field.
+            where (dict, optional): Only return items whose fields equal these plaintext values. On an
+                encrypted collection, only `_id`, unencrypted and blind-indexed fields can be matched.
+
+        Returns:
+            tuple: A Flask JSON response with the decrypted `items` and the `next` cursor (None on
+            the last page), and HTTP status code.
+        """
+        if limit is not None and limit < 1:
+            return jsonify({"error": "Invalid limit", "details": f"limit must be at least 1, got {limit}"}), 400
+        try:
+            query, projection, limit = self._page_query(after=after, limit=limit, fields=fields, where=where)
+        except ValueError as e:
+            return jsonify({"error": "Invalid filter", "details": str(e)}), 400
+        items = self._decrypt_items(self.collection.find(query, projection).sort("_id", 1).limit(limit))
+        return jsonify(self._page(self._select(items, fields), limit)), 200
+
+    def _page_query(self, after=None, limit=None, fields=None, where=None) -> tuple:
+        """Return the filter, projection and capped limit for one page."""
+        limit = min(limit or self.page_size, self.max_page_size)
+        query = self._where_query(where)
+        if after is not None:
+            query["_id"] = {"$gt": after} if "_id" not in query else {"$eq": query["_id"], "$gt": after}
+        return query, self._projection(fields), limit
+
+    def _where_query(self, where=None) -> dict:
+        """
+        Translate plaintext equality conditions into a filter on the stored documents.
+
+        Raises:
+            ValueError: If a condition is on an encrypted field without a blind index.
+        """
+        if not where:
+            return {}
+        where = {field: self._coerce(field, value) for field, value in where.items()}
+        if not self.is_encrypted or not self.encryption_manager:
+            return where
+        query = self.encryption_manager.query
+        return dict(query(self.collection_name, field, value) for field, value in where.items())
+
+    def _coerce(self, field: str, value):
+        """
+        Convert a query-string value to the type the collection schema gives `field`, so it
+        matches plaintext fields stored as numbers or booleans.
+
+        Raises:
+            ValueError: If the value cannot be converted.
+        """
+        if self.data_validator is None or not isinstance(value, str):
+            return value
+        schema = self.data_validator._get_validator(collection_name=self.collection_name).schema
+        field_type = schema.get("properties", {}).get(field, {}).get("type")
+        if field_type == "integer":
+            return int(value)
+        if field_type == "number":
+            return float(value)
+        if field_type == "boolean":
+            return value.lower() == "true"
+        return value
+
+    @staticmethod
+    def _page(items: list, limit: int) -> dict:
+        """Build the page body, with a `next` cursor unless this is the last page."""
+        return {"items": items, "next": items[-1]["_id"] if len(items) == limit else None}
+
+
+class CollectionExporter(CollectionHandler):
+    """
+    A class for streaming a whole MongoDB collection as newline-delimited JSON.
+
+    Attributes:
+        batch_size (int): Documents fetched, decrypted and sent per chunk.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, *args, batch_size=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+
+    def handle_item(self, fields=None):
+        """
+        Iterate the collection, decrypting and serializing one batch at a time.
+
+        Memory use is bounded by `batch_size` no matter how large the collection is.
+
+        Args:
+            fields (list, optional): Only export these fields (and `_id`). Defaults to every field.
+
+        Yields:
+            str: NDJSON text holding up to `batch_size` documents.
+        """
+        cursor = self.collection.find({}, self._projection(fields), batch_size=self.batch_size)
+        try:
+            while True:
+                batch = list(islice(cursor, self.batch_size))
+                if not batch:
+                    break
+                items = self._select(self._decrypt_items(batch), fields)
+                yield "".join(json.dumps(item, default=str) + "\n" for item in items)
+        finally:
+            cursor.close()
+
+
+class BulkCollectionHandler(CollectionHandler, ABC):
+    """
+    Base class for handlers that act on many items of a collection in one request.
+    """
+
+    def _validation_errors(self, items: list) -> list:
+        """
+        Validate every item against the collection schema, collecting all errors.
+
+        Args:
+            items (list): The data items to validate.
+
+        Returns:
+            list: The validation errors, empty if every item is valid or no validator is set.
+        """
+        if self.data_validator is None:
+            return []
+        return self.data_validator.validate_many(collection_name=self.collection_name, data=items)
+
+    def _cached(self, item_ids: list) -> tuple:
+        """
+        Split IDs into documents found in the cache and IDs that still have to be fetched.
+
+        Returns:
+            tuple: The cached documents, the list of missing IDs and the cache generation to
+            pass to `_remember` once they are fetched.
+        """
+        if self.cache is None:
+            return [], list(item_ids), None
+        generation = self.cache.generation()
+        cached, missing = [], []
+        for item_id in item_ids:
+            item = self.cache.get(item_id)
+            if item is None:
+                missing.append(item_id)
+            else:
+                cached.append(item)
+        return cached, missing, generation
+
+    def _remember(self, items: list, generation: int) -> list:
+        """Cache freshly fetched documents, unless they were written since `generation`, and return them."""
+        if self.cache is not None:
+            for item in items:
+                self.cache.put(item, generation=generation)
+        return items
+
+    def _forget(self, item_ids: list):
+        """Drop written or deleted documents from the cache."""
+        if self.cache is not None:
+            self.cache.invalidate(*item_ids)
+
+
+class BulkPoster(BulkCollectionHandler):
+    """
+    A class for inserting many items into a MongoDB collection with one unordered insert_many.
+    """
+
+    def handle_item(self, items: list):
+        """
+        Insert items into the collection.
+
+        Args:
+            items (list): The data items to insert.
+
+        Returns:
+            tuple: A Flask JSON response and HTTP status code.
+        """
+        errors = self._validation_errors(items)
+        if errors:
+            return jsonify({"error": "Validation failed", "details": errors}), 400
+
+        items = [{**item, "_id": str(uuid.uuid4())} for item in items]
+        result = self.collection.insert_many(self._encrypt_items(items), ordered=False)
+        return jsonify({"success": result.acknowledged, "items": items}), 201
+
+
+class BulkGetter(BulkCollectionHandler):
+    """
+    A class for retrieving many items from a MongoDB collection by their IDs.
+    """
+
+    def handle_item(self, item_ids: list):
+        """
+        Retrieve items from the collection with a single `$in` query for those not in the cache.
+
+        Args:
+            item_ids (list): The IDs of the items to retrieve.
+
+        Returns:
+            tuple: A Flask JSON response with the found items, decrypted if necessary, and HTTP status code.
+        """
+        cached, missing, generation = self._cached(item_ids)
+        items = self._decrypt_items(self.collection.find({"_id": {"$in": missing}})) if missing else []
+        return jsonify({"items": cached + self._remember(items, generation)}), 200
+
+
+class BulkUpdater(BulkCollectionHandler):
+    """
+    A class for updating many items of a MongoDB collection with one unordered bulk_write.
+    """
+
+    def handle_item(self, items: list):
+        """
+        Update items in the collection.
+
+        Args:
+            items (list): The updates, each holding the `_id` of the item and the fields to set.
+
+        Returns:
+            tuple: A Flask JSON response and HTTP status code.
+        """
+        if any("_id" not in item for item in items):
+            return jsonify({"error": "Every item must have an _id"}), 400
+        updates = [{key: value for key, value in item.items() if key != "_id"} for item in items]
+        errors = self._validation_errors(updates)
+        if errors:
+            for error in errors:
+                error["_id"] = items[error["index"]]["_id"]
+            return jsonify({"error": "Validation failed", "details": errors}), 400
+
+        if self._is_packed():
+            currents = list(self.collection.find({"_id": {"$in": [item["_id"] for item in items]}}))
+            requests = self._replacements(currents, items)
+        else:
+            requests = [UpdateOne({"_id": item["_id"]}, {"$set": update})
+                        for item, update in zip(items, self._encrypt_items(updates))]
+        if not requests:
+            return jsonify({"success": True, "matched": 0, "modified": 0}), 200
+        result = self.collection.bulk_write(requests, ordered=False)
+        self._forget([item["_id"] for item in items])
+        return jsonify({"success": result.acknowledged, "matched": result.matched_count,
+                        "modified": result.modified_count}), 200
+
+
+class BulkDeleter(BulkCollectionHandler):
+    """
+    A class for deleting many items from a MongoDB collection by their IDs.
+    """
+
+    def handle_item(self, item_ids: list):
+        """
+        Delete items from the collection with a single `$in` query.
+
+        Args:
+            item_ids (list): The IDs of the items to delete.
+
+        Returns:
+            tuple: A Flask JSON response and HTTP status code.
+        """
+        try:
+            result = self.collection.delete_many({"_id": {"$in": item_ids}})
+            self._forget(item_ids)
+            return jsonify({"success": result.acknowledged, "deleted": result.deleted_count}), 200
+        except Exception as e:
+            return jsonify({"error": "Deletion failed", "details": str(e)}), 500
+
+
+class HandlerRegistry:
+    """
+    Pre-built handlers for every collection, created once and shared by all requests.
+
+    Handlers keep no per-request state, so one instance per collection and operation can
+    serve every request. The create and update validators are compiled up front.
+
+    Attributes:
+        handler_classes (dict): The handler class built for each operation.
+        create_validator (DataValidator): Validator used by the create handlers.
+        update_validator (DataValidator): Validator used by the update handlers, ignoring required fields.
+        handlers (dict): Handlers keyed by collection name, then by operation ('retrieve',
+            'create', 'update', 'delete', their 'bulk_' variants, 'list' and 'export').
+        caches (dict): The DocumentCache of each collection, empty when caching is disabled.
+    """
+
+    handler_classes = {
+        "retrieve": CollectionGetter,
+        "create": CollectionPoster,
+        "update": CollectionUpdater,
+        "delete": CollectionDeleter,
+        "bulk_retrieve": BulkGetter,
+        "bulk_create": BulkPoster,
+        "bulk_update": BulkUpdater,
+        "bulk_delete": BulkDeleter,
+        "list": CollectionLister,
+        "export": CollectionExporter,
+    }
+
+    def __init__(self, client: MongoClient, database: str, collections: list, schema_directory='schema',
+                 encryption_manager=None, is_encrypted=False, write_concern=None, page_size=100,
+                 max_page_size=1000, export_batch_size=1000, cache_size=None, cache_ttl=None):
+        """
+        Build the handlers and compile the validators for each collection.
+
+        Args:
+            client (MongoClient): The MongoDB client.
+            database (str): The name of the database to connect to.
+            collections (list): The names of the collections to build handlers for.
+            schema_directory (str, optional): Directory holding the JSON schemas. Defaults to 'schema'.
+            encryption_manager (object, optional): An object for managing encryption and decryption.
+            is_encrypted (bool, optional): Whether the collection data is encrypted. Defaults to False.
+            write_concern (dict, optional): Write concern options for every collection's writes.
+            page_size (int, optional): Default items per page of the list handlers. Defaults to 100.
+            max_page_size (int, optional): Largest page a list request may ask for. Defaults to 1000.
+            export_batch_size (int, optional): Documents per chunk of the export handlers. Defaults to 1000.
+            cache_size (int, optional): When set, each collection gets a DocumentCache of this many
+                decrypted documents, shared by its handlers. Defaults to no caching.
+            cache_ttl (float, optional): Seconds a cached document stays valid. Defaults to no expiry.
+        """
+        self.create_validator = DataValidator(schema_directory)
+        self.update_validator = DataValidator(schema_directory, update=True)
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        self.export_batch_size = export_batch_size
+        self.handlers = {}
+        self.caches = {}
+        for collection in collections:
+            if cache_size:
+                self.caches[collection] = DocumentCache(max_size=cache_size, ttl=cache_ttl)
+            options = dict(client=client, database=database, collection=collection,
+                           encryption_manager=encryption_manager, is_encrypted=is_encrypted,
+                           write_concern=write_concern, cache=self.caches.get(collection))
+            self.handlers[collection] = {
+                operation: handler_class(**options, **self._handler_options(operation))
+                for operation, handler_class in self.handler_classes.items()
+            }
+            self.create_validator._get_validator(collection_name=collection)
+            self.update_validator._get_validator(collection_name=collection)
+
+    def _handler_options(self, operation: str) -> dict:
+        """
+        Return the operation-specific keyword arguments for a handler.
+
+        Args:
+            operation (str): The operation the handler serves.
+
+        Returns:
+            dict: Extra keyword arguments for the handler's constructor.
+        """
+        if operation in ("create", "bulk_create"):
+            return {"data_validator": self.create_validator}
+        if operation in ("update", "bulk_update"):
+            return {"data_validator": self.update_validator}
+        if operation == "list":
+            return {"data_validator": self.update_validator, "page_size": self.page_size,
+                    "max_page_size": self.max_page_size}
+        if operation == "export":
+            return {"batch_size": self.export_batch_size}
+        return {}
+
+    def get(self, collection: str, operation: str) -> CollectionHandler:
+        """
+        Return the handler for an operation on a collection.
+
+        Args:
+            collection (str): The name of the collection.
+            operation (str): One of 'retrieve', 'create', 'update', 'delete', their 'bulk_' variants,
+                'list' or 'export'.
+
+        Returns:
+            CollectionHandler: The shared handler instance.
+        """
+        return self.handlers[collection][operation]
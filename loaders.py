@@ -1,5 +1,107 @@
-from pymongo import MongoClient
-from managers import EncryptionKeyManager
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from functions import chunked
+from helpers import BulkUpdater
+from managers import BatchEncryptor, EncryptionKeyManager, EncryptionPolicy
+from readers import DatasetFile, open_dataset
+
+
+# Indexes for the reference and time fields the generated collections are queried by. Each entry is
+# a field name, a list of fields (or [field, direction] pairs) for a compound index, or a dict with
+# the "keys" and any create_index options such as "unique" or "name".
+DEFAULT_INDEXES = {
+    "applications": ["user_profile", "date_submitted"],
+    "contact_info": ["user_profile"],
+    "banking_info": ["application_id"],
+    "financial_info": ["application_id"],
+    "credit_accounts": ["user_id"],
+    "credit_transactions": [["account_id", "created"], "created"],
+}
+
+
+# Server error code for a duplicate key, which a resumed load expects for already inserted documents.
+DUPLICATE_KEY = 11000
+
+
+class LoadManifest:
+    """
+    A local record of how many batches of each collection have been committed, so that an
+    interrupted load can resume where it stopped.
+
+    The manifest belongs to the run that produced the data (seed, sizes, database, batch size):
+    batches only line up again when the same data is regenerated and re-sliced the same way,
+    so a manifest from a different run is ignored and overwritten. A dataset read from files is
+    identified by the files it resolved to (path, size and modification time) as well. A manifest
+    that matches in everything but those files is refused rather than overwritten, since the
+    batches it recorded as loaded came from other files.
+
+    Attributes:
+        path (str): Where the manifest is saved, as JSON.
+        run (dict): The parameters of the run the manifest belongs to.
+        collections (dict): Collection name to its `committed` batch count and whether it is `complete`.
+    """
+
+    def __init__(self, path: str, run: dict):
+        self.path = path
+        self.run = json.loads(json.dumps(run))
+        self.collections = {}
+        self._lock = threading.Lock()
+        saved = self.read(path)
+        if saved.get('run') == self.run:
+            self.collections = saved.get('collections', {})
+        elif saved and 'files' in self.run and self._same_except_files(saved.get('run', {})):
+            raise ValueError(f"The files of dataset {self.run['dataset']} changed since checkpoint {path} was "
+                             f"saved, refusing to resume from it. Delete it to load the dataset from scratch")
+        elif saved:
+            print(f"Checkpoint {path} belongs to a different run, starting over")
+
+    def _same_except_files(self, saved_run: dict) -> bool:
+        """Return whether `saved_run` is this run (same dataset, database, batch size) loaded from other files."""
+        if saved_run.get('files') == self.run['files']:
+            return False
+        return ({key: value for key, value in saved_run.items() if key != 'files'}
+                == {key: value for key, value in self.run.items() if key != 'files'})
+
+    @staticmethod
+    def read(path: str) -> dict:
+        """Return the saved manifest at `path`, or an empty dict if there is none."""
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def committed(self, collection: str) -> int:
+        """Return how many leading batches of `collection` are known to be in the database."""
+        return self.collections.get(collection, {}).get('committed', 0)
+
+    def complete(self, collection: str) -> bool:
+        return self.collections.get(collection, {}).get('complete', False)
+
+    def commit(self, collection: str):
+        """Record that the next batch of `collection` is in the database."""
+        with self._lock:
+            state = self.collections.setdefault(collection, {'committed': 0, 'complete': False})
+            state['committed'] += 1
+            self._save()
+
+    def finish(self, collection: str):
+        """Record that `collection` is fully loaded and indexed."""
+        with self._lock:
+            self.collections.setdefault(collection, {'committed': 0})['complete'] = True
+            self._save()
+
+    def _save(self):
+        # Written to a temporary file first, so a crash mid-write never leaves a corrupt manifest.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'run': self.run, 'collections': self.collections}, f, indent=4)
+        os.replace(temporary, self.path)
 
 
 class DataLoader:
@@ -10,51 +112,344 @@ class DataLoader:
     data = {}
     database = None
     encryption_key_path = None
+    batch_size = 1000
+    insert_workers = 4
+    parallel_collections = True
+    encryption_processes = None
+    encryptor = None
+    validator = None
+    encryption_policy = None
+    indexes = None
+    index_after_load = True
+    index_dry_run = False
+    index_timings = None
+    manifest = None
+    updates = None
+    insert_counts = None
 
-    def __init__(self, hostname: str, database: str, data: dict, port=27017, encryption_key_path="encryption_key.key"):
+    def __init__(self, hostname: str, database: str, data: dict, port=27017, encryption_key_path="encryption_key.key",
+                 batch_size=1000, insert_workers=4, parallel_collections=True, encryption_processes=None,
+                 validator=None, encryption_policy=None, indexes=None, index_after_load=True,
+                 index_dry_run=False, checkpoint_path=None, run=None, updates=None):
+        """
+        Args:
+            hostname (str): Host of the MongoDB server.
+            database (str): Name of the database to load into.
+            data (dict, str or list): Collection name to documents, either as a list or as an
+                iterable of chunks. A directory or list of data files written by DataGenerator is
+                read incrementally with `readers.open_dataset` instead.
+            port (int, optional): Port of the MongoDB server. Defaults to 27017.
+            encryption_key_path (str, optional): Path of the Fernet key file.
+            batch_size (int, optional): Documents per `insert_many` call. Defaults to 1000.
+            insert_workers (int, optional): Threads sending batches to MongoDB. Defaults to 4.
+            parallel_collections (bool, optional): Load collections that are already in memory
+                or read from files concurrently. Defaults to True.
+            encryption_processes (int, optional): Processes encrypting batches. Defaults to
+                the number of CPUs; 1 encrypts in the loader's own process.
+            validator (DataValidator, optional): When given, every batch is validated against
+                its collection's schema before it is encrypted.
+            encryption_policy (EncryptionPolicy, optional): Per-collection encryption rules. The
+                blind indexes it asks for are stored with each document and indexed.
+            indexes (dict, optional): Collection name to the indexes to build on it. Defaults to
+                `DEFAULT_INDEXES`.
+            index_after_load (bool, optional): Build indexes once a collection is loaded, which is
+                faster than maintaining them during the inserts. Defaults to True.
+            index_dry_run (bool, optional): Print the indexes that would be built without building
+                them. Defaults to False.
+            checkpoint_path (str, optional): When set, committed batches are recorded in a
+                `LoadManifest` at this path and skipped when the same run is loaded again.
+            run (dict, optional): The generation parameters (seed, sizes, ...) identifying the data,
+                which the manifest must match to be resumed from.
+            updates (dict, optional): Collection name to `$set` updates of existing documents, each
+                with the `_id` of the document it applies to, applied after the data is inserted.
+        """
         self.hostname = hostname
         self.port = port
         self.uri = f"mongodb://{hostname}:{port}/"
         self.database = database
+        if not isinstance(data, dict):
+            data = open_dataset(data, chunk_size=batch_size)
         self.data = data
         self.encryption_key_path = encryption_key_path
+        self.batch_size = batch_size
+        self.insert_workers = insert_workers
+        self.parallel_collections = parallel_collections
+        self.encryption_processes = encryption_processes
+        self.validator = validator
+        self.encryption_policy = encryption_policy or EncryptionPolicy()
+        self.indexes = DEFAULT_INDEXES if indexes is None else indexes
+        self.index_after_load = index_after_load
+        self.index_dry_run = index_dry_run
+        self.index_timings = []
+        self.updates = updates or {}
+        # Collection name to the documents inserted and the documents skipped as already present.
+        self.insert_counts = {}
+        if checkpoint_path:
+            run = {**(run or {}), "database": database, "batch_size": batch_size}
+            files = {name: source.identity() for name, source in data.items() if isinstance(source, DatasetFile)}
+            if files:
+                run["files"] = files
+            self.manifest = LoadManifest(checkpoint_path, run)
 
     def _connect(self):
         try:
-            self.client = MongoClient(self.uri)
+            self.client = MongoClient(self.uri, maxPoolSize=max(100, self.insert_workers))
             self.client.admin.command('ping')
             print("Connected to MongoDB!")
         except Exception as e:
             print("Failed to connect:", e)
             raise e
 
-    def _encrypt(self, collection_data: list[dict]):
-        em = EncryptionKeyManager(self.encryption_key_path)
-        encrypted_collection_data = []
-        for item in collection_data:
-            encrypted_item = {}
-            for key, value in item.items():
-                if key == '_id':
-                    encrypted_item[key] = value
+    def _encrypt(self, collection_name: str, collection_data: list[dict]):
+        return self.encryptor.submit(collection_data, collection=collection_name)
+
+    @staticmethod
+    def _chunks(collection_data):
+        # A plain list of documents is loaded as a single chunk, while the generators
+        # returned by a streaming DataGenerator are consumed one chunk at a time.
+        if isinstance(collection_data, list):
+            return [collection_data] if collection_data else []
+        return collection_data
+
+    def _batches(self, collection_data):
+        """Re-slice a collection's chunks into batches of `batch_size` documents."""
+        documents = (document for chunk in self._chunks(collection_data) for document in chunk)
+        return chunked(documents, self.batch_size)
+
+    def _validate(self, collection_name: str, batch: list):
+        if self.validator is None:
+            return
+        errors = self.validator.validate_many(collection_name, batch)
+        if errors:
+            details = "; ".join(f"{error['_id']}: {error['message']}" for error in errors[:5])
+            raise ValueError(f"{len(errors)} validation errors in {collection_name} batch ({details})")
+
+    def _insert_when_encrypted(self, collection, encrypted: Future, executor: ThreadPoolExecutor) -> Future:
+        """
+        Hand a batch to `executor` for insertion as soon as its encryption completes.
+
+        Returns:
+            Future: Resolves to the `_insert` result of the batch, or to the encryption or insert error.
+        """
+        result = Future()
+
+        def _inserted(inserting):
+            try:
+                result.set_result(inserting.result())
+            except Exception as e:
+                result.set_exception(e)
+
+        def _encrypted(_):
+            try:
+                executor.submit(self._insert, collection, encrypted.result()).add_done_callback(_inserted)
+            except Exception as e:
+                result.set_exception(e)
+
+        encrypted.add_done_callback(_encrypted)
+        return result
+
+    def _load_collection(self, db, collection_name: str, collection_data, executor: ThreadPoolExecutor):
+        """
+        Encrypt a collection batch by batch and hand each batch to `executor` for insertion.
+
+        Batches are encrypted by the encryptor's processes while earlier batches are still
+        in flight, and each one is inserted as soon as its encryption completes. At most two
+        batches per encryption process and per insert worker are kept in flight, so memory
+        stays bounded by the batch size.
+        """
+        collection = db[collection_name]
+        if self.manifest is not None and self.manifest.complete(collection_name):
+            print(f"Skipping {collection_name} collection, already loaded according to {self.manifest.path}")
+            return
+        if not self.index_after_load:
+            self._build_indexes(collection, collection_name)
+        # Batches are committed in order, so a resumed load skips the leading ones already recorded.
+        # They are still generated, since later batches depend on the generator's position.
+        resume_from = self.manifest.committed(collection_name) if self.manifest is not None else 0
+        in_flight = (self.encryptor.processes + self.insert_workers) * 2
+        pending = deque()
+        inserted = 0
+        duplicates = 0
+
+        def _commit_next():
+            batch_inserted, batch_duplicates = pending.popleft().result()
+            if self.manifest is not None:
+                self.manifest.commit(collection_name)
+            return batch_inserted, batch_duplicates
+
+        for number, batch in enumerate(self._batches(collection_data)):
+            if number < resume_from:
+                continue
+            self._validate(collection_name, batch)
+            pending.append(self._insert_when_encrypted(collection, self._encrypt(collection_name, batch), executor))
+            while pending and (len(pending) > in_flight or pending[0].done()):
+                batch_inserted, batch_duplicates = _commit_next()
+                inserted += batch_inserted
+                duplicates += batch_duplicates
+        while pending:
+            batch_inserted, batch_duplicates = _commit_next()
+            inserted += batch_inserted
+            duplicates += batch_duplicates
+        self.insert_counts[collection_name] = (inserted, duplicates)
+        resumed = f", resumed after {resume_from} batches" if resume_from else ""
+        print(f"Inserted {inserted} documents into {collection_name} collection "
+              f"({duplicates} already present{resumed})")
+        if self.index_after_load:
+            self._build_indexes(collection, collection_name)
+        if self.manifest is not None:
+            self.manifest.finish(collection_name)
+
+    @staticmethod
+    def _insert(collection, documents: list) -> tuple:
+        """
+        Insert a batch unordered, tolerating documents that are already in the collection, e.g.
+        from batches that were in flight when an earlier run stopped.
+
+        Returns:
+            tuple: The number of documents inserted and the number skipped as duplicates.
+
+        Raises:
+            BulkWriteError: If any document failed for a reason other than a duplicate key.
+        """
+        try:
+            return len(collection.insert_many(documents, ordered=False).inserted_ids), 0
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if e.details.get('writeConcernErrors') or any(error.get('code') != DUPLICATE_KEY for error in errors):
+                raise
+            return e.details.get('nInserted', 0), len(errors)
+
+    def _index_plan(self, collection_name: str) -> list:
+        """
+        Resolve the declared indexes of a collection against the encryption policy.
+
+        Encrypted fields are indexed through their blind index, which only serves equality
+        lookups. Indexes on encrypted fields without one would index random ciphertext, so a
+        compound index is cut down to its usable prefix, and dropped if there is none (or if it is
+        unique or named, which the prefix must not inherit). Each skipped field is reported once.
+        Every blind index gets an index of its own.
+
+        Returns:
+            list: (keys, options) pairs, where `keys` is a list of (field, direction) pairs.
+        """
+        policy = self.encryption_policy
+        plan = []
+        skipped = []
+        for spec in self.indexes.get(collection_name, []):
+            options = {}
+            if isinstance(spec, dict):
+                options = {key: value for key, value in spec.items() if key != "keys"}
+                spec = spec["keys"]
+            fields = [spec] if isinstance(spec, str) else spec
+            keys = [(field, ASCENDING) if isinstance(field, str) else tuple(field) for field in fields]
+
+            resolved = []
+            for field, direction in keys:
+                if not policy.encrypts(collection_name, field):
+                    resolved.append((field, direction))
+                elif field in policy.blind_indexes(collection_name):
+                    resolved.append((policy.index_field(field), direction))
+                else:
+                    if field not in skipped:
+                        skipped.append(field)
+                    break
+            if len(resolved) < len(keys) and (options.get("unique") or options.get("name")):
+                # A prefix is a different index, which must not inherit the uniqueness or name.
+                continue
+            if resolved and all(planned != resolved for planned, _ in plan):
+                plan.append((resolved, options))
+
+        for field in skipped:
+            print(f"Skipping index on {collection_name}.{field}: the field is encrypted without a blind index")
+        for field in policy.blind_indexes(collection_name):
+            keys = [(policy.index_field(field), ASCENDING)]
+            if all(planned != keys for planned, _ in plan):
+                plan.append((keys, {}))
+        return plan
+
+    def _build_indexes(self, collection, collection_name: str):
+        """Build the planned indexes of a collection, timing each one, or print them on a dry run."""
+        for keys, options in self._index_plan(collection_name):
+            if self.index_dry_run:
+                print(f"[dry run] Would build index {keys}{f' {options}' if options else ''} on {collection_name} collection")
+                continue
+            started = time.perf_counter()
+            name = collection.create_index(keys, **options)
+            elapsed = time.perf_counter() - started
+            self.index_timings.append((collection_name, name, elapsed))
+            print(f"Built index {name} on {collection_name} collection in {elapsed:.2f}s")
+
+    def _apply_updates(self, db):
+        """
+        Encrypt the updates following the encryption policy and apply them with unordered bulk writes.
+
+        Encrypted fields of packed collections are sealed into each document's payload, which a
+        `$set` cannot reach, so those documents are read, merged and replaced the way the app's
+        `BulkUpdater` does it.
+        """
+        policy = self.encryption_policy
+        for collection_name, updates in self.updates.items():
+            encrypted = any(policy.encrypts(collection_name, field) for update in updates for field in update)
+            replace = policy.packed(collection_name) and encrypted
+            if replace:
+                updater = BulkUpdater(self.client, self.database, collection_name, is_encrypted=True,
+                                      encryption_manager=EncryptionKeyManager(self.encryption_key_path,
+                                                                              policy=policy))
+                changes = updates
+            elif policy.packed(collection_name):
+                changes = updates
+            else:
+                changes = self.encryptor.encrypt(updates, collection=collection_name)
+            matched = modified = 0
+            for batch in chunked(changes, self.batch_size):
+                if replace:
+                    currents = list(db[collection_name].find({"_id": {"$in": [change["_id"] for change in batch]}}))
+                    requests = updater._replacements(currents, batch)
                 else:
-                    encrypted_item[key] = em.encrypt(value)
-            encrypted_collection_data.append(encrypted_item)
-        return encrypted_collection_data
+                    requests = [UpdateOne({"_id": change["_id"]},
+                                          {"$set": {key: value for key, value in change.items() if key != "_id"}})
+                                for change in batch]
+                if not requests:
+                    continue
+                result = db[collection_name].bulk_write(requests, ordered=False)
+                matched += result.matched_count
+                modified += result.modified_count
+            print(f"Updated {modified} of {matched} matched documents in {collection_name} collection")
 
     def _load(self):
         try:
             db = self.client[self.database]
-            for collection_data in self.data:
-                collection = db[collection_data]
-                encrypted_collection_data = self._encrypt(self.data[collection_data])
-                collection.insert_many(encrypted_collection_data)
-                print(f"Inserted {len(encrypted_collection_data)} documents into {collection_data} collection")
+            with ThreadPoolExecutor(max_workers=self.insert_workers) as executor:
+                # Collections that are generated lazily share the generator's process-wide
+                # random state, so only those already in memory or read from their own file
+                # are loaded side by side.
+                independent = [name for name in self.data if isinstance(self.data[name], (list, DatasetFile))]
+                streamed = [name for name in self.data if name not in independent]
+                workers = len(independent) if self.parallel_collections and independent else 1
+                with ThreadPoolExecutor(max_workers=workers) as collection_executor:
+                    futures = [collection_executor.submit(self._load_collection, db, name, self.data[name], executor)
+                               for name in independent]
+                    for name in streamed:
+                        self._load_collection(db, name, self.data[name], executor)
+                    for future in futures:
+                        future.result()
+            self._apply_updates(db)
         except Exception as e:
             raise e
 
     def start(self):
         try:
             self._connect()
-            self._load()
+            with BatchEncryptor(self.encryption_key_path, processes=self.encryption_processes,
+                                policy=self.encryption_policy) as encryptor:
+                self.encryptor = encryptor
+                self._load()
+                print(encryptor.report())
+            if self.index_timings:
+                print(f"Built {len(self.index_timings)} indexes in "
+                      f"{sum(elapsed for _, _, elapsed in self.index_timings):.2f}s")
         except Exception as e:
+            if self.manifest is not None:
+                raise RuntimeError(f"There was an error in loading the data: {str(e)}. Progress is saved in "
+                                   f"{self.manifest.path}, run again with the same seed to resume")
             raise RuntimeError(f"There was an error in loading the data: {str(e)}")
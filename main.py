@@ -1,7 +1,11 @@
 import json
+import time
 
-from generators import DataGenerator
-from loaders import DataLoader
+from pymongo import MongoClient
+from generators import DataGenerator, DeltaGenerator
+from loaders import DataLoader, LoadManifest
+from managers import EncryptionPolicy
+from validation import DataValidator
 
 if __name__ == '__main__':
     try:
@@ -13,11 +17,90 @@ if __name__ == '__main__':
             database = config['database']
             n_applications = config['n_applications']
             credit_transaction_size = config['credit_transaction_size']
+            chunk_size = config.get('chunk_size')
+            workers = config.get('workers', 1)
+            seed = config.get('seed')
+            backend = config.get('backend', 'python')
+            pool_size = config.get('pool_size')
+            unique_fields = config.get('unique_fields', ["valid_id_number"])
+            output_format = config.get('output_format', 'json')
+            per_record = config.get('per_record', False)
+            reference_time = config.get('reference_time')
+            batch_size = config.get('batch_size', 1000)
+            insert_workers = config.get('insert_workers', 4)
+            encryption_processes = config.get('encryption_processes')
+            validate = config.get('validate', False)
+            indexes = config.get('indexes')
+            index_after_load = config.get('index_after_load', True)
+            index_dry_run = config.get('index_dry_run', False)
+            checkpoint = config.get('checkpoint')
+            dataset = config.get('dataset')
+            delta = config.get('delta')
     except Exception as e:
         raise e
 
-    dg = DataGenerator(n_applications=n_applications, credit_transaction_size=credit_transaction_size)
-    data = dg.start()
+    if delta:
+        # Grow the loaded dataset tick by tick instead of generating a new one.
+        options = {"applications": delta.get('applications', 0),
+                   "credit_transactions": delta.get('credit_transactions', 0),
+                   "updates": delta.get('updates'), "seed": delta.get('seed'), "backend": backend,
+                   "output_format": output_format}
+        source = delta.get('source', 'mongo')
+        if source == 'mongo':
+            deltas = DeltaGenerator.from_mongo(MongoClient(f"mongodb://{hostname}:{port}/")[database], **options)
+        else:
+            deltas = DeltaGenerator.from_dataset(source, **options)
+        # Ticks continue from the last one loaded with this seed, so reruns add new records.
+        first_tick = deltas.next_tick()
+        for tick in range(first_tick, first_tick + delta.get('ticks', 1)):
+            if tick > first_tick:
+                time.sleep(delta.get('interval', 0))
+            inserts, updates = deltas.tick(tick)
+            deltas.write(tick, inserts, updates)
+            load_options = {"hostname": hostname, "port": port, "database": database, "batch_size": batch_size,
+                            "insert_workers": insert_workers, "encryption_processes": encryption_processes,
+                            "validator": DataValidator('schema') if validate else None,
+                            "encryption_policy": EncryptionPolicy.from_config(config), "indexes": {}}
+            # Inserts and updates are recorded separately, so a tick whose updates failed is resumed
+            # with its updates only instead of replaying inserts that are already loaded.
+            if not deltas.is_inserted(tick):
+                loader = DataLoader(data=inserts, **load_options)
+                loader.start()
+                replayed = [name for name, (inserted, duplicates) in loader.insert_counts.items()
+                            if duplicates and not inserted]
+                if replayed:
+                    raise RuntimeError(f"Every document of tick {tick} in {', '.join(replayed)} was already loaded. "
+                                       f"The delta seed {deltas.seed} has been loaded before without "
+                                       f"{deltas.ticks_path}; set a new seed")
+                deltas.inserted(tick)
+            if updates:
+                DataLoader(data={}, updates=updates, **load_options).start()
+            deltas.loaded(tick)
+    else:
+        if dataset:
+            # Replay previously generated files instead of generating new data.
+            data = dataset
+            run = {"dataset": dataset}
+        else:
+            if seed is None and checkpoint:
+                # Resuming needs the exact same data, so reuse the seed of the interrupted run.
+                seed = LoadManifest.read(checkpoint).get('run', {}).get('seed')
 
-    dl = DataLoader(hostname=hostname, port=port, database=database, data=data)
-    dl.start()
+            dg = DataGenerator(n_applications=n_applications, credit_transaction_size=credit_transaction_size,
+                               chunk_size=chunk_size, workers=workers, seed=seed,
+                               backend=backend, pool_size=pool_size, unique_fields=unique_fields,
+                               output_format=output_format, per_record=per_record, reference_time=reference_time)
+            data = dg.start()
+            run = {"seed": dg.seed, "n_applications": n_applications,
+                   "credit_transaction_size": credit_transaction_size, "chunk_size": chunk_size,
+                   "backend": backend, "pool_size": pool_size, "unique_fields": unique_fields,
+                   "per_record": per_record, "reference_time": reference_time}
+
+        dl = DataLoader(hostname=hostname, port=port, database=database, data=data,
+                        batch_size=batch_size, insert_workers=insert_workers,
+                        encryption_processes=encryption_processes,
+                        validator=DataValidator('schema') if validate else None,
+                        encryption_policy=EncryptionPolicy.from_config(config), indexes=indexes,
+                        index_after_load=index_after_load, index_dry_run=index_dry_run, checkpoint_path=checkpoint,
+                        run=run)
+        dl.start()
@@ -1,19 +1,102 @@
+import base64
+import hashlib
+import hmac
 import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+import bson
+from bson import Binary
 from cryptography.fernet import Fernet
 
 
+class EncryptionPolicy:
+    """
+    Per-collection rules for how documents are stored, read from the "encryption" section of config.json.
+
+    A collection's `blind_index` fields are still Fernet-encrypted, but are also stored with a
+    keyed HMAC of their value in `<field>_bidx`, so equality lookups can use an index:
+
+        {"encryption": {"credit_transactions": {"blind_index": ["account_id"]}}}
+
+    With `"encoding": "packed"`, a collection's encrypted fields are BSON-encoded together and
+    stored as a single Fernet token in `payload_field`, instead of one string token per field.
+    Rules under `"*"` apply to every collection unless the collection overrides them.
+
+    When a collection lists its `encrypted` fields, only those are encrypted and every other
+    field is stored in plaintext, where it can be indexed, filtered and sorted on natively:
+
+        {"encryption": {"applications": {"encrypted": ["notes", "user_profile"]}}}
+
+    Collections without the rule have every field but `_id` encrypted.
+
+    Attributes:
+        collections (dict): The rules of each collection, keyed by collection name.
+    """
+
+    index_suffix = '_bidx'
+    payload_field = '_encrypted'
+
+    def __init__(self, collections=None):
+        self.collections = collections or {}
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(config.get('encryption', {}))
+
+    def _rules(self, collection) -> dict:
+        return {**self.collections.get('*', {}), **self.collections.get(collection, {})}
+
+    def blind_indexes(self, collection) -> tuple:
+        """Return the fields of `collection` that are stored with a blind index."""
+        return tuple(self._rules(collection).get('blind_index', ()))
+
+    def encrypted_fields(self, collection):
+        """Return the fields of `collection` that are encrypted, or None if every field is."""
+        fields = self._rules(collection).get('encrypted')
+        return None if fields is None else frozenset(fields)
+
+    def plaintext(self, collection, document: dict, skip=('_id',)):
+        """Return the fields of `document` stored in plaintext: `skip` plus those the policy leaves unencrypted."""
+        fields = self.encrypted_fields(collection)
+        if fields is None:
+            return skip
+        return {*skip, *(key for key in document if key not in fields)}
+
+    def encrypts(self, collection, field: str) -> bool:
+        """Return whether `field` of `collection` is stored encrypted."""
+        fields = self.encrypted_fields(collection)
+        return field != '_id' and (fields is None or field in fields)
+
+    def packed(self, collection) -> bool:
+        """Return whether `collection`'s encrypted fields are stored together in one payload."""
+        return self._rules(collection).get('encoding', 'fields') == 'packed'
+
+    def index_field(self, field: str) -> str:
+        """Return the name of the field holding `field`'s blind index."""
+        return f"{field}{self.index_suffix}"
+
+    def derived_fields(self, collection) -> set:
+        """Return the stored-only fields of `collection` that are dropped when decrypting."""
+        return {self.index_field(field) for field in self.blind_indexes(collection)}
+
+
 class EncryptionKeyManager:
     key_path = None
     key = None
     cipher = None
+    policy = None
 
-    def __init__(self, key_path='encryption_key.key'):
+    def __init__(self, key_path='encryption_key.key', policy=None):
         self.key_path = key_path
         if os.path.exists(self.key_path):
             self.key = self._load_key()
         else:
             self.key = self._generate_key()
         self.cipher = Fernet(self.key)
+        self.policy = policy or EncryptionPolicy()
+        # Blind indexes use their own key, derived from the Fernet key, so the two never mix.
+        self._index_key = hmac.new(self.key, b'blind-index', hashlib.sha256).digest()
 
     def _generate_key(self):
         # Generate a new key and save it to the file
@@ -31,3 +114,217 @@ class EncryptionKeyManager:
 
     def decrypt(self, token):
         return self.cipher.decrypt(token).decode('utf-8')
+
+    def blind_index(self, value) -> str:
+        """Return the deterministic HMAC-SHA256 of `value`, for indexed equality lookups."""
+        return hmac.new(self._index_key, str(value).encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def encrypt_document(self, document: dict, skip=('_id',), collection=None) -> dict:
+        """
+        Encrypt the fields of `document` that `collection`'s policy marks as encrypted. Those in
+        `skip` are always copied as is.
+
+        The blind indexes `collection`'s policy asks for are added next to their fields.
+        """
+        skip = self.policy.plaintext(collection, document, skip)
+        if self.policy.packed(collection):
+            encrypted = self.pack(document, skip=skip)
+        else:
+            encrypt = self.encrypt
+            encrypted = {key: value if key in skip else encrypt(value) for key, value in document.items()}
+        for field in self.policy.blind_indexes(collection):
+            if field in document:
+                encrypted[self.policy.index_field(field)] = self.blind_index(document[field])
+        return encrypted
+
+    def decrypt_document(self, document: dict, skip=('_id',), collection=None) -> dict:
+        """Decrypt every field of `document` except those in `skip`, without modifying `document`."""
+        return self.decrypt_many((document,), skip=skip, collection=collection)[0]
+
+    def decrypt_many(self, documents, skip=('_id',), collection=None) -> list:
+        """
+        Decrypt a batch of documents.
+
+        Args:
+            documents (iterable): A list of encrypted documents or a pymongo cursor over them.
+            skip (tuple, optional): Fields stored in plaintext. Defaults to ('_id',).
+            collection (str, optional): The collection the documents come from. Its blind index
+                fields are left out of the result.
+
+        Returns:
+            list: The decrypted documents, in the order they were given.
+        """
+        decrypt = self.cipher.decrypt
+        derived = self.policy.derived_fields(collection)
+        payload_field = self.policy.payload_field
+        encrypted = self.policy.encrypted_fields(collection)
+
+        def _decrypt_fields(document):
+            return {key: decrypt(value).decode('utf-8') if key not in skip and (encrypted is None or key in encrypted)
+                    else value for key, value in document.items() if key not in derived}
+
+        # Packed and per-field documents are told apart by the payload, so a collection can
+        # switch encoding without re-encrypting what is already stored.
+        return [self.unpack(document) if payload_field in document else _decrypt_fields(document)
+                for document in documents]
+
+    def pack(self, document: dict, skip=('_id',)) -> dict:
+        """
+        Encrypt every field of `document` except those in `skip` as one BSON-encoded payload.
+
+        Field types (numbers, booleans, dates, nested documents) survive the round trip, and the
+        whole document costs one Fernet call. The token is stored as raw BSON Binary rather than
+        base64 text.
+        """
+        packed = {key: value for key, value in document.items() if key in skip}
+        fields = bson.encode({key: value for key, value in document.items() if key not in skip})
+        packed[self.policy.payload_field] = Binary(base64.urlsafe_b64decode(self.cipher.encrypt(fields)))
+        return packed
+
+    def unpack(self, document: dict) -> dict:
+        """Decrypt a document stored by `pack`, dropping its blind index fields."""
+        payload_field = self.policy.payload_field
+        unpacked = {key: value for key, value in document.items()
+                    if key != payload_field and not key.endswith(self.policy.index_suffix)}
+        unpacked.update(bson.decode(self.cipher.decrypt(base64.urlsafe_b64encode(document[payload_field]))))
+        return unpacked
+
+    def query(self, collection: str, field: str, value) -> tuple:
+        """
+        Translate an equality condition on a plaintext value into one on the stored documents.
+
+        Args:
+            collection (str): The collection being queried.
+            field (str): The field to match.
+            value: The plaintext value to match.
+
+        Returns:
+            tuple: The stored field name and the value to match it against.
+
+        Raises:
+            ValueError: If the field is encrypted without a blind index and so cannot be matched.
+        """
+        if not self.policy.encrypts(collection, field):
+            return field, value
+        if field in self.policy.blind_indexes(collection):
+            return self.policy.index_field(field), self.blind_index(value)
+        raise ValueError(f"{field} of {collection} is encrypted without a blind index and cannot be queried")
+
+
+# The key manager of an encryption worker process, set once by `_init_encryption_worker`.
+_worker_manager = None
+
+
+def _init_encryption_worker(key_path, policy_rules=None):
+    global _worker_manager
+    _worker_manager = EncryptionKeyManager(key_path, policy=EncryptionPolicy(policy_rules))
+
+
+def _encrypt_chunk(documents: list, skip: tuple, collection=None) -> list:
+    encrypt_document = _worker_manager.encrypt_document
+    return [encrypt_document(document, skip=skip, collection=collection) for document in documents]
+
+
+class BatchEncryptor:
+    """
+    Encrypts batches of documents across a pool of processes, each with its own EncryptionKeyManager.
+
+    Attributes:
+        key_path (str): Path of the Fernet key file shared by every worker.
+        processes (int): Number of worker processes. With 1, batches are encrypted in-process.
+        chunk_size (int): Documents per task sent to a worker.
+        skip (tuple): Fields that are left unencrypted.
+        policy (EncryptionPolicy): The per-collection rules every worker applies.
+        fields (int): Number of fields encrypted so far.
+    """
+
+    def __init__(self, key_path='encryption_key.key', processes=None, chunk_size=500, skip=('_id',), policy=None):
+        self.key_path = key_path
+        self.policy = policy or EncryptionPolicy()
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.skip = tuple(skip)
+        self.fields = 0
+        self._lock = threading.Lock()
+        self._started = None
+        self._finished = None
+        # Make sure the key exists before any worker tries to read (or create) it.
+        self._manager = EncryptionKeyManager(key_path, policy=self.policy)
+        self._executor = None
+        if self.processes > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_encryption_worker,
+                                                 initargs=(key_path, self.policy.collections))
+
+    def _record(self, documents: list, collection=None):
+        # Counted on the plaintext, so packed and per-field encoding report comparable rates.
+        encrypted = self.policy.encrypted_fields(collection)
+        with self._lock:
+            self.fields += sum(1 for document in documents for key in document
+                               if key not in self.skip and (encrypted is None or key in encrypted))
+            self._finished = time.perf_counter()
+
+    def submit(self, documents: list, collection=None) -> Future:
+        """
+        Start encrypting a batch of documents of `collection`.
+
+        Returns:
+            Future: Resolves to the encrypted documents, in the same order, ready to insert.
+        """
+        if self._started is None:
+            self._started = time.perf_counter()
+        result = Future()
+        if self._executor is None:
+            encrypted = [self._manager.encrypt_document(document, skip=self.skip, collection=collection)
+                         for document in documents]
+            self._record(documents, collection)
+            result.set_result(encrypted)
+            return result
+
+        chunks = [self._executor.submit(_encrypt_chunk, documents[i:i + self.chunk_size], self.skip, collection)
+                  for i in range(0, len(documents), self.chunk_size)]
+        remaining = [len(chunks)]
+
+        def _done(_):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                encrypted = [document for chunk in chunks for document in chunk.result()]
+            except Exception as e:
+                result.set_exception(e)
+                return
+            self._record(documents, collection)
+            result.set_result(encrypted)
+
+        if not chunks:
+            result.set_result([])
+        for chunk in chunks:
+            chunk.add_done_callback(_done)
+        return result
+
+    def encrypt(self, documents: list, collection=None) -> list:
+        """Encrypt a batch of documents and wait for the result."""
+        return self.submit(documents, collection=collection).result()
+
+    @property
+    def fields_per_second(self) -> float:
+        """Fields encrypted per second of wall-clock time since the first batch was submitted."""
+        if self._started is None or self._finished is None or self._finished <= self._started:
+            return 0.0
+        return self.fields / (self._finished - self._started)
+
+    def report(self) -> str:
+        elapsed = (self._finished - self._started) if self._started and self._finished else 0.0
+        return (f"Encrypted {self.fields} fields in {elapsed:.2f}s "
+                f"({self.fields_per_second:,.0f} fields/sec, {self.processes} processes)")
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,52 @@
+"""Request parsing shared by the Flask app (app.py) and the ASGI app (asgi.py).
+
+The helpers take the already-read query arguments and JSON body, so both frontends
+validate input the same way. Errors are returned as `(body, status)` tuples, which
+Flask and Quart both turn into a JSON response.
+"""
+
+PAGING_ARGUMENTS = ('after', 'limit', 'fields')
+
+
+def unknown_collection(collection: str, handlers: dict):
+    """Return a 404 response if `collection` has no handlers, otherwise None."""
+    if collection not in handlers:
+        return {"error": f"Unknown collection {collection}"}, 404
+    return None
+
+
+def invalid_item(data):
+    """Return a 400 response if a create/update body is empty, otherwise None."""
+    if not data:
+        return {"error": "Invalid input"}, 400
+    return None
+
+
+def invalid_items(data):
+    """Return a 400 response if a bulk create/update body is not a non-empty list, otherwise None."""
+    if not data or not isinstance(data, list):
+        return {"error": "Invalid input"}, 400
+    return None
+
+
+def failure(message: str, error: Exception):
+    """Return the 500 response for an unexpected error while handling a request."""
+    return {"error": message, "details": str(error)}, 500
+
+
+def bulk_ids(args, body=None) -> list:
+    """Read item IDs from `?ids=a,b` (or repeated `ids`) query arguments, or from a JSON list body."""
+    ids = [item_id for value in args.getlist('ids') for item_id in value.split(',') if item_id]
+    if not ids and isinstance(body, list):
+        ids = body
+    return ids
+
+
+def fields(args):
+    """Return the `?fields=a,b` projection as a list, or None for whole documents."""
+    return [field for field in args.get('fields', '').split(',') if field] or None
+
+
+def where(args):
+    """Every query argument other than the paging ones is an equality filter, e.g. `?account_id=...`."""
+    return {key: value for key, value in args.items() if key not in PAGING_ARGUMENTS} or None
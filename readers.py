@@ -0,0 +1,162 @@
+import gzip
+import json
+import os
+import re
+import bson
+from functions import chunked
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches the files written by DataGenerator ("20240101_120000_applications_data.ndjson.gz") as well
+# as plain "<collection>.<format>" files such as a mongodump's "applications.bson".
+DATASET_FILE = re.compile(r"^(?:(?P<timestamp>\d{8}_\d{6})_)?(?P<collection>.+?)(?:_data)?"
+                          r"\.(?P<format>json|ndjson|ndjson\.gz|ndjson\.zst|bson|parquet)$")
+
+
+def loads_line(line):
+    """Parse one line of NDJSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def _iter_json_array(path: str, block_size=1 << 20):
+    """
+    Yield the documents of a JSON array file one at a time.
+
+    The file is read in blocks of `block_size` characters and decoded document by document,
+    so memory use is bounded by the block and document size rather than by the file size.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(block_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{path} is not a JSON array")
+        position = 1
+        eof = False
+        while True:
+            # Skip the whitespace and separators between documents.
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                document, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The document continues past the end of the buffer; read the next block.
+                block = f.read(block_size)
+                eof = not block
+                buffer = buffer[position:] + block
+                position = 0
+                continue
+            yield document
+            position = end
+            if position > block_size:
+                buffer = buffer[position:]
+                position = 0
+
+
+def _iter_ndjson(path: str, compression=None):
+    if compression == 'gzip':
+        f = gzip.open(path, 'rb')
+    elif compression == 'zstd':
+        import io
+        import zstandard
+        f = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    else:
+        f = open(path, 'rb')
+    with f:
+        for line in f:
+            if line.strip():
+                yield loads_line(line)
+
+
+def _iter_bson(path: str):
+    with open(path, 'rb') as f:
+        yield from bson.decode_file_iter(f)
+
+
+def _iter_parquet(path: str, batch_size=1000):
+    import pyarrow.parquet
+    for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield from batch.to_pylist()
+
+
+# Iterates the documents of a file in each format.
+READERS = {
+    "json": lambda path: _iter_json_array(path),
+    "ndjson": lambda path: _iter_ndjson(path),
+    "ndjson.gz": lambda path: _iter_ndjson(path, compression='gzip'),
+    "ndjson.zst": lambda path: _iter_ndjson(path, compression='zstd'),
+    "bson": lambda path: _iter_bson(path),
+    "parquet": lambda path: _iter_parquet(path),
+}
+
+
+class DatasetFile:
+    """
+    A collection stored in a data file, read incrementally in chunks every time it is iterated.
+
+    Attributes:
+        path (str): The data file.
+        collection (str): The collection the file holds.
+        format (str): One of `READERS`, taken from the file name.
+        chunk_size (int): Documents per chunk.
+    """
+
+    def __init__(self, path: str, chunk_size=1000):
+        match = DATASET_FILE.match(os.path.basename(path))
+        if match is None:
+            raise ValueError(f"Cannot tell the collection and format of {path}")
+        self.path = path
+        self.collection = match.group('collection')
+        self.format = match.group('format')
+        self.chunk_size = chunk_size
+
+    def __iter__(self):
+        return chunked(READERS[self.format](self.path), self.chunk_size)
+
+    def identity(self) -> dict:
+        """Return the file's absolute path, size and modification time, which change if it is replaced or grows."""
+        stat = os.stat(self.path)
+        return {"path": os.path.abspath(self.path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def __repr__(self):
+        return f"DatasetFile({self.path!r})"
+
+
+def open_dataset(source, chunk_size=1000) -> dict:
+    """
+    Find the data files of a dataset.
+
+    Args:
+        source (str or list): A directory, in which the most recent file of each collection is
+            used (by the timestamp in its name), or a data file, or a list of data files.
+        chunk_size (int, optional): Documents per chunk read. Defaults to 1000.
+
+    Returns:
+        dict: Collection name to its `DatasetFile`.
+
+    Raises:
+        ValueError: If no data files are found.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source)) if DATASET_FILE.match(name)]
+    elif isinstance(source, str):
+        paths = [source]
+    else:
+        paths = list(source)
+
+    dataset = {}
+    for path in paths:
+        # Sorted by name, so later timestamps replace earlier ones.
+        file = DatasetFile(path, chunk_size=chunk_size)
+        dataset[file.collection] = file
+    if not dataset:
+        raise ValueError(f"No data files found in {source}")
+    return dataset
@@ -0,0 +1,369 @@
+"""
+Replays a configurable mix of create/retrieve/update/delete calls against the Flask app's CRUD
+routes at a target request rate, to exercise the MongoDB server behind it with realistic traffic.
+
+Start the app first, e.g. `flask --app app run --with-threads`, then run
+
+    python traffic.py --url http://127.0.0.1:5000 --rps 500 --duration 60 --concurrency 200 \\
+        --mix create=1,retrieve=6,update=2,delete=1
+
+Payloads are generated with DataGenerator (or read from a previously generated `--dataset`), and
+the IDs that retrieve, update and delete calls target are those of the records created up front,
+of the dataset, and of every record created during the run.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from bisect import bisect_left
+from datetime import datetime
+import aiohttp
+from generators import DataGenerator
+from readers import open_dataset
+
+# The route name of each collection, as in `/create/<route>/`.
+ROUTES = {
+    "applications": "application",
+    "user_profiles": "user_profile",
+    "contact_info": "contact_info",
+    "banking_info": "banking_info",
+    "financial_info": "financial_info",
+    "credit_accounts": "credit_account",
+    "credit_transactions": "credit_transaction",
+}
+
+OPERATIONS = ("create", "retrieve", "update", "delete")
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Parse an operation mix such as "create=1,retrieve=6,update=2,delete=1" into weights.
+
+    Raises:
+        ValueError: If an operation is unknown or no operation has a positive weight.
+    """
+    weights = {}
+    for entry in mix.split(','):
+        operation, _, weight = entry.partition('=')
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}, expected one of {', '.join(OPERATIONS)}")
+        weights[operation] = float(weight or 1)
+    if not any(weight > 0 for weight in weights.values()):
+        raise ValueError(f"The mix {mix!r} has no operation with a positive weight")
+    return weights
+
+
+class LatencyHistogram:
+    """
+    Counts latencies in fixed log-scale buckets, so memory stays constant however long the run.
+
+    Percentiles are read from buckets that are 2 ** (1/8) (about 9%) wide, and `histogram` shows a
+    coarser 1-2-5 histogram.
+
+    Attributes:
+        count (int): Latencies recorded.
+        errors (int): Requests that failed or returned an error status.
+        total (float): Sum of the latencies in milliseconds.
+        max (float): Highest latency in milliseconds.
+    """
+
+    # Upper bounds in milliseconds, from 0.1 ms to about 105 s.
+    bounds = tuple(0.1 * 2 ** (i / 8) for i in range(161))
+    display_bounds = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = [0] * (len(self.bounds) + 1)
+        self._display = [0] * (len(self.display_bounds) + 1)
+
+    def record(self, milliseconds: float, error=False):
+        self.count += 1
+        self.errors += error
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+        self._buckets[bisect_left(self.bounds, milliseconds)] += 1
+        self._display[bisect_left(self.display_bounds, milliseconds)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Return the upper bound of the bucket holding the `q`-th percentile (0-100), in milliseconds."""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(q / 100 * self.count))
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def histogram(self) -> str:
+        """Return the non-empty display buckets, e.g. "<=5ms:120 <=10ms:33 >5000ms:1"."""
+        labels = [f"<={bound}ms" for bound in self.display_bounds] + [f">{self.display_bounds[-1]}ms"]
+        return " ".join(f"{label}:{count}" for label, count in zip(labels, self._display) if count)
+
+
+class TrafficDriver:
+    """
+    Drives open-loop traffic at the app: requests are sent on a fixed schedule of `rps` per second
+    whether or not earlier ones have completed, with at most `concurrency` in flight.
+
+    Latency is measured from the time a request was scheduled rather than sent, so time spent
+    waiting for a free connection when the app falls behind shows up in the results instead of
+    silently lowering the request rate.
+
+    Attributes:
+        url (str): Base URL of the app.
+        rps (float): Target requests per second.
+        duration (float): Seconds to send requests for.
+        concurrency (int): Maximum requests (and connections) in flight.
+        mix (dict): Operation to its weight.
+        payloads (dict): Collection to the documents (without `_id`) that creates and updates send.
+        ids (dict): Collection to the IDs of the records that exist, updated as records are created
+            and deleted.
+        timeout (float): Seconds before a request counts as failed.
+        report_interval (float): Seconds between progress lines.
+        elapsed (float): Seconds the last run took, including the wait for requests in flight.
+        stats (dict): (operation, collection) to its `LatencyHistogram`.
+    """
+
+    url = None
+    rps = 100.0
+    duration = 60.0
+    concurrency = 100
+    timeout = 30.0
+    report_interval = 10.0
+    elapsed = 0.0
+
+    def __init__(self, url: str, payloads: dict, ids=None, rps=100.0, duration=60.0, concurrency=100,
+                 mix=None, seed=None, timeout=30.0, report_interval=10.0):
+        """
+        Args:
+            url (str): Base URL of the app, e.g. "http://127.0.0.1:5000".
+            payloads (dict): Collection to the documents to create and update records with. The
+                collections to send traffic to are its keys.
+            ids (dict, optional): Collection to the IDs of records that already exist.
+            rps (float, optional): Target requests per second. Defaults to 100.
+            duration (float, optional): Seconds to send requests for. Defaults to 60.
+            concurrency (int, optional): Maximum requests in flight. Defaults to 100.
+            mix (dict, optional): Operation to its weight. Defaults to mostly retrieves.
+            seed (int, optional): Seed of the sequence of operations, collections and payloads.
+            timeout (float, optional): Seconds before a request counts as failed. Defaults to 30.
+            report_interval (float, optional): Seconds between progress lines. Defaults to 10.
+
+        Raises:
+            ValueError: If a collection has no route or no payloads.
+        """
+        for collection, documents in payloads.items():
+            if collection not in ROUTES:
+                raise ValueError(f"No route for {collection}, expected one of {', '.join(ROUTES)}")
+            if not documents:
+                raise ValueError(f"No payloads for {collection}")
+        self.url = url.rstrip('/')
+        self.payloads = {collection: [{key: value for key, value in document.items() if key != '_id'}
+                                      for document in documents] for collection, documents in payloads.items()}
+        self.ids = {collection: list((ids or {}).get(collection, ())) for collection in payloads}
+        self.rps = rps
+        self.duration = duration
+        self.concurrency = concurrency
+        self.mix = mix or {"create": 1, "retrieve": 6, "update": 2, "delete": 1}
+        self.timeout = timeout
+        self.report_interval = report_interval
+        self.stats = {}
+        self._rng = random.Random(seed)
+        self._collections = list(self.payloads)
+        self._operations = [operation for operation in OPERATIONS if self.mix.get(operation, 0) > 0]
+        self._weights = [self.mix[operation] for operation in self._operations]
+
+    def _next_request(self) -> tuple:
+        """
+        Pick the next request: the operation, collection, method, URL and JSON body.
+
+        Operations that need an existing record fall back to a create while the collection has none.
+        """
+        collection = self._rng.choice(self._collections)
+        operation = self._rng.choices(self._operations, self._weights)[0]
+        ids = self.ids[collection]
+        if operation != 'create' and not ids:
+            operation = 'create'
+        route = ROUTES[collection]
+        if operation == 'create':
+            return operation, collection, 'POST', f"{self.url}/create/{route}/", self._rng.choice(self.payloads[collection])
+
+        index = self._rng.randrange(len(ids))
+        item_id = ids[index]
+        if operation == 'retrieve':
+            return operation, collection, 'GET', f"{self.url}/retrieve/{route}/{item_id}/", None
+        if operation == 'update':
+            # Set one field to a value taken from another payload, and refresh `updated`.
+            document = self._rng.choice(self.payloads[collection])
+            field = self._rng.choice([key for key in document if key != 'updated'] or list(document))
+            payload = {field: document[field]}
+            if 'updated' in document:
+                payload['updated'] = datetime.now().isoformat()
+            return operation, collection, 'PATCH', f"{self.url}/update/{route}/{item_id}/", payload
+        # Removed before the delete is sent so no other request picks the record in the meantime.
+        ids[index] = ids[-1]
+        ids.pop()
+        return operation, collection, 'DELETE', f"{self.url}/delete/{route}/{item_id}/", None
+
+    async def _send(self, session: aiohttp.ClientSession, scheduled: float, slots: asyncio.Semaphore):
+        operation, collection, method, url, payload = self._next_request()
+        error = True
+        try:
+            async with session.request(method, url, json=payload) as response:
+                body = await response.read()
+                error = response.status >= 400
+                if operation == 'create' and not error:
+                    self.ids[collection].append(json.loads(body)["item"]["_id"])
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError):
+            pass
+        finally:
+            slots.release()
+            key = (operation, collection)
+            if key not in self.stats:
+                self.stats[key] = LatencyHistogram()
+            self.stats[key].record((time.perf_counter() - scheduled) * 1000, error)
+
+    def _progress(self, started: float, sent: int):
+        elapsed = time.perf_counter() - started
+        completed = sum(histogram.count for histogram in self.stats.values())
+        errors = sum(histogram.errors for histogram in self.stats.values())
+        print(f"{elapsed:6.0f}s: {sent} sent, {completed} completed ({completed / elapsed:,.0f} req/s), "
+              f"{errors} errors, {sent - completed} in flight")
+
+    async def run(self) -> dict:
+        """
+        Send requests for `duration` seconds and wait for the ones in flight.
+
+        Returns:
+            dict: (operation, collection) to its `LatencyHistogram`.
+        """
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         json_serialize=lambda data: json.dumps(data, default=str)) as session:
+            started = time.perf_counter()
+            next_report = started + self.report_interval
+            sent = 0
+            while True:
+                scheduled = started + sent / self.rps
+                if scheduled >= started + self.duration:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await slots.acquire()
+                task = asyncio.create_task(self._send(session, scheduled, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += 1
+                if time.perf_counter() >= next_report:
+                    self._progress(started, sent)
+                    next_report += self.report_interval
+            if tasks:
+                await asyncio.gather(*tasks)
+            self.elapsed = time.perf_counter() - started
+        return self.stats
+
+    def report(self):
+        """Print the throughput, latency percentiles and histogram of every operation and collection."""
+        completed = sum(histogram.count for histogram in self.stats.values())
+        errors = sum(histogram.errors for histogram in self.stats.values())
+        print(f"{completed} requests in {self.elapsed:.1f}s ({completed / self.elapsed:,.0f} req/s, "
+              f"target {self.rps:,.0f}), {errors} errors")
+        print(f"  {'route':<32}{'n':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}"
+              f"{'p99 ms':>10}{'max ms':>10}")
+        for (operation, collection), histogram in sorted(self.stats.items()):
+            print(f"  {operation + ' ' + collection:<32}{histogram.count:>8}{histogram.errors:>8}"
+                  f"{histogram.count / self.elapsed:>9.1f}{histogram.percentile(50):>10.2f}"
+                  f"{histogram.percentile(95):>10.2f}{histogram.percentile(99):>10.2f}{histogram.max:>10.2f}")
+        print("Latency histograms")
+        for (operation, collection), histogram in sorted(self.stats.items()):
+            print(f"  {operation + ' ' + collection:<32}{histogram.histogram()}")
+
+
+def generate_payloads(collections: list, records: int, seed=None) -> dict:
+    """
+    Generate `records` documents of each collection with DataGenerator, without writing any files.
+    """
+    generator = DataGenerator(n_applications=records, credit_transaction_size=records, seed=seed, per_record=True)
+    sizes = generator._collection_sizes()
+    unknown = set(collections) - set(sizes)
+    if unknown:
+        raise ValueError(f"Cannot generate {', '.join(sorted(unknown))}, expected one of {', '.join(sizes)}")
+    return {collection: generator.records(collection, 0, sizes[collection]) for collection in collections}
+
+
+def read_payloads(source, collections: list, records: int) -> dict:
+    """
+    Read up to `records` documents of each collection from a previously generated dataset.
+    """
+    dataset = open_dataset(source, chunk_size=records)
+    payloads = {}
+    for collection in collections:
+        if collection not in dataset:
+            raise ValueError(f"The dataset has no {collection} file")
+        payloads[collection] = next(iter(dataset[collection]), [])
+    return payloads
+
+
+async def preload(url: str, payloads: dict, chunk_size=500) -> dict:
+    """
+    Create every payload through the bulk endpoints, so the run starts with records to read.
+
+    Returns:
+        dict: Collection to the IDs of the records created.
+    """
+    ids = {}
+    async with aiohttp.ClientSession(json_serialize=lambda data: json.dumps(data, default=str)) as session:
+        for collection, documents in payloads.items():
+            ids[collection] = []
+            for start in range(0, len(documents), chunk_size):
+                items = [{key: value for key, value in document.items() if key != '_id'}
+                         for document in documents[start:start + chunk_size]]
+                async with session.post(f"{url.rstrip('/')}/bulk/{collection}/", json=items) as response:
+                    body = await response.json()
+                    if response.status >= 400:
+                        raise RuntimeError(f"Preloading {collection} failed: {body}")
+                ids[collection].extend(item["_id"] for item in body["items"])
+            print(f"Created {len(ids[collection])} {collection} records to send traffic to")
+    return ids
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--rps', type=float, default=100, help="target requests per second")
+    parser.add_argument('--duration', type=float, default=60, help="seconds to send requests for")
+    parser.add_argument('--concurrency', type=int, default=100, help="maximum requests in flight")
+    parser.add_argument('--mix', default="create=1,retrieve=6,update=2,delete=1",
+                        help="weight of each operation")
+    parser.add_argument('--collections', default=",".join(ROUTES), help="collections to send traffic to")
+    parser.add_argument('--records', type=int, default=200, help="payloads per collection")
+    parser.add_argument('--dataset', help="read payloads and existing IDs from this generated dataset "
+                                          "(already loaded with main.py) instead of generating and creating them")
+    parser.add_argument('--seed', type=int, help="seed of the payloads and of the sequence of requests")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--report-interval', type=float, default=10, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    collections = [collection for collection in args.collections.split(',') if collection]
+    if args.dataset:
+        payloads = read_payloads(args.dataset, collections, args.records)
+        ids = {collection: [document['_id'] for document in documents] for collection, documents in payloads.items()}
+    else:
+        payloads = generate_payloads(collections, args.records, seed=args.seed)
+        ids = asyncio.run(preload(args.url, payloads))
+
+    driver = TrafficDriver(args.url, payloads, ids=ids, rps=args.rps, duration=args.duration,
+                           concurrency=args.concurrency, mix=parse_mix(args.mix), seed=args.seed,
+                           timeout=args.timeout, report_interval=args.report_interval)
+    asyncio.run(driver.run())
+    driver.report()
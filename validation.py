@@ -1,28 +1,45 @@
-from jsonschema import validate, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+from concurrent.futures import ProcessPoolExecutor
 import json
 import os
 
 
+def _validate_chunk(schema_directory: str, update: bool, collection_name: str, data: list, offset: int) -> list:
+    return DataValidator(schema_directory, update=update)._collect_errors(collection_name, data, offset)
+
+
 class DataValidator:
     """
     A class for validating data against JSON schemas stored in a specified directory.
 
     Attributes:
         schema_directory (str): The directory path where JSON schema files are stored.
+        update (bool): Whether required fields are ignored, as for update operations.
+        executor (ProcessPoolExecutor): Pool that `validate_many` sends chunks to, if any.
     """
     schema_directory = None
     update = False
+    executor = None
+    # Compiled validators shared by every DataValidator, keyed by (schema path, update)
+    # and stored together with the mtime of the schema file they were built from.
+    _compiled = {}
 
-    def __init__(self, schema_directory: str, update=False):
+    def __init__(self, schema_directory: str, update=False, executor=None):
         """
         Initialize the DataValidator with the directory containing JSON schemas.
 
         Args:
             schema_directory (str): Path to the directory containing JSON schema files.
             update(bool): Bool to ignore required fields during update operations
+            executor (ProcessPoolExecutor, optional): Pool to validate chunks in. When omitted,
+                one is started by the first `validate_many` call with `workers` and reused until
+                `close`.
         """
         self.schema_directory = schema_directory
         self.update = update
+        self.executor = executor
+        self._owns_executor = False
 
     def _load_schema(self, collection_name: str):
         """
@@ -44,6 +61,50 @@ class DataValidator:
         with open(schema_path, "r") as f:
             return json.load(f)
 
+    def _compile(self, schema: dict):
+        """
+        Build a validator for `schema`, checking the schema itself once.
+
+        Args:
+            schema (dict): The loaded JSON schema.
+
+        Returns:
+            Validator: A jsonschema validator instance for the schema.
+        """
+        if self.update:
+            schema = {key: value for key, value in schema.items() if key != "required"}
+        cls = validator_for(schema)
+        cls.check_schema(schema)
+        return cls(schema)
+
+    def _get_validator(self, collection_name: str):
+        """
+        Return the compiled validator for a collection, rebuilding it when its schema file changes.
+
+        Args:
+            collection_name (str): The name of the collection (used to locate the schema file).
+
+        Returns:
+            Validator: A jsonschema validator instance for the collection's schema.
+
+        Raises:
+            ValueError: If the schema file does not exist in the specified directory.
+        """
+        schema_path = os.path.join(self.schema_directory, f"{collection_name}.json")
+        try:
+            mtime = os.path.getmtime(schema_path)
+        except OSError:
+            raise ValueError(f"Schema file for {collection_name} does not exist at {schema_path}.")
+
+        key = (os.path.abspath(schema_path), self.update)
+        cached = self._compiled.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        validator = self._compile(self._load_schema(collection_name=collection_name))
+        self._compiled[key] = (mtime, validator)
+        return validator
+
     def validate(self, data: dict, collection_name: str):
         """
         Validate the given data against the schema for the specified collection.
@@ -55,11 +116,68 @@ class DataValidator:
         Raises:
             ValueError: If the data does not conform to the schema or if the schema file is invalid.
         """
-        schema = self._load_schema(collection_name=collection_name)
-        if self.update:
-            schema.pop("required")
-        try:
-            validate(instance=data, schema=schema)
-        except ValidationError as e:
-            raise ValueError(f"Validation failed for {collection_name}: {e.message}")
-    
\ No newline at end of file
+        validator = self._get_validator(collection_name=collection_name)
+        error = best_match(validator.iter_errors(data))
+        if error is not None:
+            raise ValueError(f"Validation failed for {collection_name}: {error.message}")
+    
+    def _collect_errors(self, collection_name: str, data: list, offset=0) -> list:
+        validator = self._get_validator(collection_name=collection_name)
+        errors = []
+        for index, item in enumerate(data, start=offset):
+            for error in validator.iter_errors(item):
+                errors.append({
+                    "index": index,
+                    "_id": item.get("_id") if isinstance(item, dict) else None,
+                    "path": "/".join(str(part) for part in error.absolute_path),
+                    "message": error.message,
+                })
+        return errors
+
+    def validate_many(self, collection_name: str, data: list, workers=None, chunk_size=5000) -> list:
+        """
+        Validate a batch of documents against the schema for the specified collection.
+
+        Unlike `validate`, every error of every document is collected instead of raising on the first.
+
+        Args:
+            collection_name (str): The name of the collection (used to locate the schema file).
+            data (list): The documents to validate.
+            workers (int, optional): Validate chunks of the batch in this many processes, in
+                the pool this validator keeps. Defaults to validating in the current process,
+                unless the validator was given an executor.
+            chunk_size (int, optional): Documents per chunk sent to a worker process. Defaults to 5000.
+
+        Returns:
+            list: One dict per error with the document's `index` in `data`, its `_id`, the
+            `path` of the offending field and the error `message`. Empty if all documents are valid.
+
+        Raises:
+            ValueError: If the schema file does not exist in the specified directory.
+        """
+        data = list(data)
+        parallel = self.executor is not None or (workers and workers > 1)
+        if not parallel or len(data) <= chunk_size:
+            return self._collect_errors(collection_name, data)
+
+        self._get_validator(collection_name=collection_name)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+            self._owns_executor = True
+        futures = [self.executor.submit(_validate_chunk, self.schema_directory, self.update, collection_name,
+                                        data[start:start + chunk_size], start)
+                   for start in range(0, len(data), chunk_size)]
+        return [error for future in futures for error in future.result()]
+
+    def close(self):
+        """Shut down the pool started by `validate_many`. A pool passed in by the caller is left running."""
+        if self._owns_executor:
+            self.executor.shutdown()
+            self.executor = None
+            self._owns_executor = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,120 @@
+import numpy as np
+from datetime import timedelta
+import functions
+from functions import generate_user_profile, generate_contact_info
+
+# Columnar counterparts of the generators in `functions.py`. Every numeric, categorical
+# and timestamp column is drawn with one NumPy call per shard, and the columns are zipped
+# into documents at the end of each generator, since the loader and writers take
+# documents. Text columns come from Faker, or from the process's `FakerPool` when one is
+# configured; without a pool they dominate, so applications and banking_info gain little.
+
+rng = np.random.default_rng()
+
+
+def reseed(seed: int):
+    """Seed the NumPy generator together with `random` and Faker."""
+    global rng
+    functions.reseed(seed)
+    rng = np.random.default_rng(seed)
+
+
+def random_dates(start, end, n: int) -> list:
+    """
+    Draw `n` ISO 8601 timestamps between `start` and `end`, formatted like `datetime.isoformat()`.
+
+    Offsets are whole seconds, so every timestamp shares `start`'s microseconds, and the
+    fractional part is left out when they are zero, as `isoformat()` does.
+    """
+    offsets = rng.integers(0, int((end - start).total_seconds()), n, endpoint=True)
+    stamps = np.datetime64(start, 'us') + offsets.astype('timedelta64[s]')
+    return np.datetime_as_string(stamps, unit='us' if start.microsecond else 's').tolist()
+
+
+def random_choices(options: list, n: int) -> list:
+    return [options[i] for i in rng.integers(0, len(options), n).tolist()]
+
+
+def random_amounts(low: float, high: float, n: int) -> list:
+    return np.round(rng.uniform(low, high, n), 2).tolist()
+
+
+def random_uuids(n: int) -> list:
+    """Draw `n` version 4 UUID strings, formatting them as one hex buffer."""
+    raw = rng.integers(0, 256, (n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    digits = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype='S1').reshape(n, 32)
+    dash = np.full((n, 1), b'-', dtype='S1')
+    parts = np.hstack([digits[:, :8], dash, digits[:, 8:12], dash, digits[:, 12:16], dash,
+                       digits[:, 16:20], dash, digits[:, 20:]])
+    return parts.view('S36').ravel().astype('U36').tolist()
+
+
+def to_documents(columns: dict) -> list:
+    """Turn a mapping of equally long columns into a list of documents."""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def generate_application(uuids: dict, chunk_size=None):
+    n = len(uuids['applications'])
+    now = functions.now()
+    columns = {
+        "_id": uuids['applications'],
+        "user_profile": uuids['users'],
+        "date_submitted": random_dates(now - timedelta(days=730), now, n),
+        "app_status": random_choices(["Pending", "Approved", "Rejected"], n),
+        "mode": random_choices(["Online", "In-Person"], n),
+        "notes": functions.faker_column("notes", n),
+        "apply_attempt": rng.integers(1, 3, n, endpoint=True).tolist(),
+        "updated": [now.isoformat()] * n
+    }
+    return functions._collect(to_documents(columns), chunk_size)
+
+
+def generate_banking_info(num_entries: int, application_ids: list, chunk_size=None):
+    columns = {
+        "_id": random_uuids(num_entries),
+        "application_id": application_ids[:num_entries],
+        "bank_name": functions.faker_column("bank_name", num_entries),
+        "account_type": random_choices(["Savings", "Checking"], num_entries),
+        "account_number": rng.integers(10000000, 99999999, num_entries, endpoint=True).tolist(),
+        "bank_status": random_choices(["Active", "Inactive"], num_entries)
+    }
+    return functions._collect(to_documents(columns), chunk_size)
+
+
+def generate_financial_info(num_entries: int, application_ids: list, chunk_size=None):
+    columns = {
+        "_id": random_uuids(num_entries),
+        "application_id": application_ids[:num_entries],
+        "income": random_amounts(20000, 200000, num_entries),
+        "net_assets": random_amounts(50000, 500000, num_entries),
+        "net_debt": random_amounts(0, 200000, num_entries),
+        "updated": [functions.now().isoformat()] * num_entries
+    }
+    return functions._collect(to_documents(columns), chunk_size)
+
+
+def generate_credit_account(uuids: list, user_ids: list, chunk_size=None):
+    n = len(uuids)
+    columns = {
+        "_id": uuids,
+        "user_id": user_ids[:n],
+        "credit_score": rng.integers(300, 850, n, endpoint=True).tolist(),
+        "updated": [functions.now().isoformat()] * n
+    }
+    return functions._collect(to_documents(columns), chunk_size)
+
+
+def generate_credit_transactions(num_entries: int, ca_ids: list, chunk_size=None):
+    now = functions.now()
+    columns = {
+        "_id": random_uuids(num_entries),
+        "account_id": [ca_ids[i] for i in rng.integers(0, len(ca_ids), num_entries).tolist()],
+        "amount": random_amounts(50, 5000, num_entries),
+        "created": random_dates(now - timedelta(days=365), now, num_entries),
+        "updated": [now.isoformat()] * num_entries
+    }
+    return functions._collect(to_documents(columns), chunk_size)
@@ -0,0 +1,194 @@
+import gzip
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+import bson
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_line(document: dict) -> bytes:
+    """Serialize a document as one line of JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(document) + b"\n"
+    return json.dumps(document, ensure_ascii=False).encode('utf-8') + b"\n"
+
+
+class DatasetWriter(ABC):
+    """
+    Writes one collection to a file chunk by chunk, keeping track of its throughput.
+
+    Attributes:
+        path (str): The file being written.
+        documents (int): Documents written so far.
+        seconds (float): Time spent writing, excluding the time spent producing the chunks.
+    """
+
+    path = None
+    documents = 0
+    seconds = 0.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self.documents = 0
+        self.seconds = 0.0
+
+    def write(self, documents: list):
+        """Append a chunk of documents to the file."""
+        started = time.perf_counter()
+        self._write(documents)
+        self.documents += len(documents)
+        self.seconds += time.perf_counter() - started
+
+    def close(self):
+        started = time.perf_counter()
+        self._close()
+        self.seconds += time.perf_counter() - started
+
+    @abstractmethod
+    def _write(self, documents: list):
+        pass
+
+    @abstractmethod
+    def _close(self):
+        pass
+
+    def report(self) -> str:
+        size = os.path.getsize(self.path) / 2 ** 20
+        documents_per_second = self.documents / self.seconds if self.seconds else 0.0
+        megabytes_per_second = size / self.seconds if self.seconds else 0.0
+        return (f"Wrote {self.documents} documents ({size:.1f} MB) to {self.path} in {self.seconds:.2f}s "
+                f"({documents_per_second:,.0f} docs/sec, {megabytes_per_second:.1f} MB/sec)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonWriter(DatasetWriter):
+    """
+    Writes a pretty-printed JSON array (indent=4), the layout the generator has always produced.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w+', encoding='utf-8')
+        self._file.write('[')
+        self._separator = '\n'
+
+    def _write(self, documents: list):
+        if not documents:
+            return
+        # One dumps call per chunk; its brackets are dropped so chunks splice into one array.
+        self._file.write(self._separator)
+        self._file.write(json.dumps(documents, ensure_ascii=False, indent=4)[2:-2])
+        self._separator = ',\n'
+
+    def _close(self):
+        self._file.write('\n]' if self._separator != '\n' else ']')
+        self._file.close()
+
+
+class NdjsonWriter(DatasetWriter):
+    """
+    Writes one JSON document per line, optionally gzip or zstd compressed.
+
+    Attributes:
+        compression (str): None, 'gzip' or 'zstd'.
+    """
+
+    compression = None
+
+    def __init__(self, path: str, compression=None):
+        super().__init__(path)
+        self.compression = compression
+        if compression is None:
+            self._file = open(path, 'wb')
+        elif compression == 'gzip':
+            self._file = gzip.open(path, 'wb', compresslevel=6)
+        elif compression == 'zstd':
+            import zstandard
+            self._raw = open(path, 'wb')
+            self._file = zstandard.ZstdCompressor(level=3).stream_writer(self._raw)
+        else:
+            raise ValueError(f"Unknown compression: {compression}")
+
+    def _write(self, documents: list):
+        self._file.write(b"".join(dumps_line(document) for document in documents))
+
+    def _close(self):
+        self._file.close()
+        if self.compression == 'zstd':
+            self._raw.close()
+
+
+class BsonWriter(DatasetWriter):
+    """
+    Writes concatenated BSON documents, the format of `mongodump`, so the file can be loaded with
+    `mongorestore --db <database> --collection <collection> <file>`.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'wb')
+
+    def _write(self, documents: list):
+        encode = bson.encode
+        self._file.write(b"".join(encode(document) for document in documents))
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetWriter(DatasetWriter):
+    """
+    Writes a Parquet file with one row group per chunk, for columnar analytics.
+
+    The schema is inferred from the first chunk. pyarrow is only imported when this format is used.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        import pyarrow
+        import pyarrow.parquet
+        self._pyarrow = pyarrow
+        self._parquet = pyarrow.parquet
+        self._writer = None
+
+    def _write(self, documents: list):
+        if not documents:
+            return
+        schema = self._writer.schema if self._writer is not None else None
+        table = self._pyarrow.Table.from_pylist(documents, schema=schema)
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.path, table.schema, compression='zstd')
+        self._writer.write_table(table)
+
+    def _close(self):
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.path, self._pyarrow.schema([]))
+        self._writer.close()
+
+
+# Creates the writer of each output format for a path, whose extension is the format name.
+WRITERS = {
+    "json": lambda path: JsonWriter(path),
+    "ndjson": lambda path: NdjsonWriter(path),
+    "ndjson.gz": lambda path: NdjsonWriter(path, compression='gzip'),
+    "ndjson.zst": lambda path: NdjsonWriter(path, compression='zstd'),
+    "bson": lambda path: BsonWriter(path),
+    "parquet": lambda path: ParquetWriter(path),
+}
+
+
+def open_writer(output_format: str, path: str) -> DatasetWriter:
+    """Return the writer for `output_format`, writing to `path`."""
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}, expected one of {', '.join(WRITERS)}")
+    return WRITERS[output_format](path)